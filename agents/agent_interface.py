@@ -1,6 +1,7 @@
 import logging
 import json
 from abc import ABC, abstractmethod
+from collections import deque
 
 # Setting up basic logging for the agent interface
 logging.basicConfig(level=logging.INFO)
@@ -114,16 +115,106 @@ class CommunicationAgent(AgentInterface):
         # Clear inbox after processing
         self.inbox.clear()
 
+    def update_status(self, status):
+        super().update_status(status)
+
+    def get_state(self):
+        return super().get_state()
+
+class IncrementalModel(ABC):
+    """
+    Interface for models that learn from a stream of experiences. The learner
+    hands over experiences in mini-batches and the model applies one aggregated
+    update per batch, so the cost per experience stays small.
+    """
+
+    @abstractmethod
+    def partial_fit(self, batch):
+        """
+        Update the model with a mini-batch (a list) of experiences.
+        """
+        pass
+
+    def get_state(self):
+        """
+        Return a small summary of the model for the agent's state.
+        """
+        return {}
+
+class KnowledgeBaseModel(IncrementalModel):
+    """
+    Keeps the most recent experiences in a bounded window, together with
+    running counts, instead of an ever-growing list.
+    """
+
+    def __init__(self, max_size=10000):
+        self.recent = deque(maxlen=max_size)
+        self.experience_count = 0
+        self.batch_count = 0
+
+    def partial_fit(self, batch):
+        self.recent.extend(batch)
+        self.experience_count += len(batch)
+        self.batch_count += 1
+
+    def get_state(self):
+        return {
+            "experiences": self.experience_count,
+            "batches": self.batch_count,
+            "retained": len(self.recent)
+        }
+
+class RunningAverageModel(IncrementalModel):
+    """
+    Tracks an exponential moving average of every numeric field in dict
+    experiences. Each batch moves the averages once, towards the batch means,
+    by the learning rate.
+    """
+
+    def __init__(self, learning_rate=0.1):
+        self.learning_rate = learning_rate
+        self.averages = {}
+        self.experience_count = 0
+
+    def partial_fit(self, batch):
+        sums = {}
+        counts = {}
+        for experience in batch:
+            if not isinstance(experience, dict):
+                continue
+            for key, value in experience.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    sums[key] = sums.get(key, 0.0) + value
+                    counts[key] = counts.get(key, 0) + 1
+
+        for key, total in sums.items():
+            mean = total / counts[key]
+            average = self.averages.get(key)
+            # A field seen for the first time starts at its batch mean
+            self.averages[key] = mean if average is None else average + self.learning_rate * (mean - average)
+        self.experience_count += len(batch)
+
+    def get_state(self):
+        return {"experiences": self.experience_count, "averages": dict(self.averages)}
+
 class LearningAgent(AgentInterface):
     """
     A concrete class for an agent focused on learning from data and interacting with
     other agents or the environment to improve its performance.
+
+    Given an IncrementalModel, the agent runs as a streaming learner: process_inbox
+    drains the inbox in mini-batches of batch_size messages and applies one model
+    update per batch, without per-message logging or an unbounded knowledge base.
     """
 
-    def __init__(self, agent_id, name, learning_rate=0.1):
+    def __init__(self, agent_id, name, learning_rate=0.1, model=None, batch_size=256):
         super().__init__(agent_id, name)
         self.learning_rate = learning_rate
         self.knowledge_base = []
+        self.inbox = []
+        self.outbox = []
+        self.model = model
+        self.batch_size = batch_size
 
     def send_message(self, message):
         """
@@ -151,16 +242,50 @@ class LearningAgent(AgentInterface):
         self.knowledge_base.append(experience_data)
         self.update_status("learning")
 
+    def update_status(self, status):
+        """
+        Update the status, logging only actual changes.
+        """
+        if status != self.status:
+            super().update_status(status)
+
+    def get_state(self):
+        state = super().get_state()
+        if self.model is not None:
+            state["model"] = self.model.get_state()
+        return state
+
     def process_inbox(self):
         """
         Process all messages in the inbox that could help improve learning.
+
+        :return: Number of messages processed.
         """
-        for message in self.inbox:
-            # Learn from the message content (for this example, we're appending to the knowledge base)
-            self.learn_from_experience(message)
+        # Swap the inbox out first so messages arriving meanwhile are kept for the next call
+        messages, self.inbox = self.inbox, []
 
-        # Clear inbox after processing
-        self.inbox.clear()
+        if self.model is None:
+            for done, message in enumerate(messages):
+                try:
+                    # Learn from the message content (for this example, we're appending to the knowledge base)
+                    self.learn_from_experience(message)
+                except Exception:
+                    # Put the unprocessed messages back ahead of anything that arrived meanwhile
+                    self.inbox[:0] = messages[done:]
+                    raise
+            return len(messages)
+
+        for start in range(0, len(messages), self.batch_size):
+            try:
+                self.model.partial_fit(messages[start:start + self.batch_size])
+            except Exception:
+                # Earlier batches are already in the model; keep the failed batch and the rest for a retry
+                self.inbox[:0] = messages[start:]
+                raise
+        if messages:
+            logger.debug(f"Agent {self.name} learned from {len(messages)} messages")
+            self.update_status("learning")
+        return len(messages)
 
 # Example usage:
 if __name__ == "__main__":
@@ -177,4 +302,10 @@ if __name__ == "__main__":
     agent_2.process_inbox()
 
     # Print agent state
-    print(agent_2.get_state())
\ No newline at end of file
+    print(agent_2.get_state())
+
+    # A streaming learner folds whole mini-batches of messages into its model
+    agent_3 = LearningAgent(agent_id="003", name="Arete", model=RunningAverageModel(learning_rate=0.1))
+    agent_3.inbox.extend({"reward": i % 3, "confidence": 0.5} for i in range(10000))
+    agent_3.process_inbox()
+    print(agent_3.get_state())
\ No newline at end of file
@@ -21,9 +21,40 @@ class Config:
     LEARNING_RATE = 0.01  # Learning rate for agent models
     AGENT_MEMORY_SIZE = 1000  # Maximum size of agent's memory
 
+    # Agent data storage settings
+    AGENT_STORE_BACKEND = 'json'  # Options: json (one file per agent), sqlite (shared WAL database)
+    AGENT_STORE_PATH = os.path.join(AGENT_DATA_DIR, 'agents.db')  # Database used by the sqlite backend
+    AGENT_WRITE_BEHIND = False  # Keep agent state in memory and write it back periodically
+    AGENT_CACHE_FLUSH_INTERVAL = 1.0  # Seconds between write-behind flushes
+    EVENT_SNAPSHOT_EVERY = 1000  # Agent state events between journal snapshots
+    EVENT_SEGMENT_BYTES = 4 * 1024 * 1024  # Size at which the agent event log starts a new segment
+
+    # Training data storage settings
+    TRAINING_SEGMENT_BYTES = 16 * 1024 * 1024  # Size at which the training step log starts a new segment
+    TRAINING_FSYNC_POLICY = 'interval'  # Options: always, interval, never
+    TRAINING_FSYNC_INTERVAL = 1.0  # Seconds between syncs under the 'interval' policy
+    TRAINING_STATS_FIELDS = ('reward',)  # Numeric step fields with running statistics
+    TRAINING_STATS_BUCKET_SECONDS = 3600  # Width of a time bucket in the training histograms
+    TRAINING_STATS_MAX_BUCKETS = 720  # Newest time buckets kept per field
+
+    # Data retention and compaction settings (None disables a limit)
+    DATA_RETENTION_MAX_AGE = None  # Seconds of training history and log entries to keep
+    DATA_RETENTION_MAX_BYTES = None  # Maximum bytes per training step log or log file
+    DATA_RETENTION_KEEP_LAST = None  # Maximum number of training steps / log entries kept (newest first)
+    DATA_DOWNSAMPLE_AFTER = None  # Seconds after which training steps are thinned out
+    DATA_DOWNSAMPLE_FACTOR = 10  # Keep one in this many steps once thinned
+    DATA_COMPACTION_INTERVAL = 300  # Seconds between background compaction passes
+
+    # Background I/O settings
+    IO_WORKERS = 4  # Threads that perform deferred file I/O
+    IO_MAX_PENDING = 1024  # Queued I/O tasks before callers are made to wait
+
     # Communication settings
     NETWORK_TIMEOUT = 30  # Timeout in seconds for network connections
     COMMUNICATION_PROTOCOL = 'HTTP'  # Protocol used for agent communication
+    # Send messages as length-prefixed frames. This changes the wire format: servers
+    # from before framing cannot read framed messages, so set False to talk to them
+    NETWORK_FRAMED_MESSAGES = True
 
     # Server settings
     SERVER_HOST = '127.0.0.1'
@@ -38,6 +69,7 @@ class Config:
     # Network simulation settings
     SIMULATION_STEP_INTERVAL = 1  # Interval in seconds between each simulation step
     AGENT_INTERACTION_THRESHOLD = 0.8  # Threshold to trigger agent interactions
+    SIMULATION_WORKERS = os.cpu_count() or 1  # Worker processes for parallel simulation runs
 
     # Other configurations
     ENABLE_AGENT_MONITORING = True
@@ -50,6 +82,19 @@ class Config:
         return {
             'agent_lifespan': Config.AGENT_LIFESPAN,
             'learning_rate': Config.LEARNING_RATE,
+            'agent_store_backend': Config.AGENT_STORE_BACKEND,
+            'agent_write_behind': Config.AGENT_WRITE_BEHIND,
+            'agent_cache_flush_interval': Config.AGENT_CACHE_FLUSH_INTERVAL,
+            'event_snapshot_every': Config.EVENT_SNAPSHOT_EVERY,
+            'training_segment_bytes': Config.TRAINING_SEGMENT_BYTES,
+            'training_fsync_policy': Config.TRAINING_FSYNC_POLICY,
+            'training_fsync_interval': Config.TRAINING_FSYNC_INTERVAL,
+            'data_retention_max_age': Config.DATA_RETENTION_MAX_AGE,
+            'data_retention_max_bytes': Config.DATA_RETENTION_MAX_BYTES,
+            'data_retention_keep_last': Config.DATA_RETENTION_KEEP_LAST,
+            'data_compaction_interval': Config.DATA_COMPACTION_INTERVAL,
+            'io_workers': Config.IO_WORKERS,
+            'io_max_pending': Config.IO_MAX_PENDING,
             'network_timeout': Config.NETWORK_TIMEOUT,
             'communication_protocol': Config.COMMUNICATION_PROTOCOL,
             'server_host': Config.SERVER_HOST,
@@ -59,6 +104,7 @@ class Config:
             'log_file_name': Config.LOG_FILE_NAME,
             'simulation_step_interval': Config.SIMULATION_STEP_INTERVAL,
             'agent_interaction_threshold': Config.AGENT_INTERACTION_THRESHOLD,
+            'simulation_workers': Config.SIMULATION_WORKERS,
             'enable_agent_monitoring': Config.ENABLE_AGENT_MONITORING,
             'skip_intro': Config.SKIP_INTRO,
             'agent_interaction_rate': Config.AGENT_INTERACTION_RATE,
@@ -0,0 +1,159 @@
+import atexit
+import logging
+import threading
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_agent_cache():
+    """Returns the process-wide write-behind cache, flushed every Config.AGENT_CACHE_FLUSH_INTERVAL seconds."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None or _shared_cache.closed:
+            _shared_cache = WriteBehindCache(Config.AGENT_CACHE_FLUSH_INTERVAL)
+            atexit.register(_shared_cache.close)
+        return _shared_cache
+
+
+class _CacheEntry:
+    __slots__ = ('state', 'writer', 'version', 'flushed_version')
+
+    def __init__(self, state, writer=None):
+        self.state = state
+        self.writer = writer
+        self.version = 0
+        self.flushed_version = 0
+
+
+class WriteBehindCache:
+    """
+    In-memory write-behind cache for per-agent state dicts.
+
+    Reads are served from memory after the first load, and writes only mark the
+    entry dirty. A background thread flushes dirty entries every flush_interval
+    seconds through each entry's writer, so any number of updates to a hot agent
+    between two flushes cost a single write. flush() writes pending changes
+    immediately and close() flushes and stops the background thread.
+
+    Cached dicts are never handed out directly; callers get shallow copies.
+    """
+
+    def __init__(self, flush_interval=1.0):
+        """
+        Initializes the cache.
+
+        :param flush_interval: Seconds between background flushes.
+        """
+        self.flush_interval = flush_interval
+        self.entries = {}
+        self.lock = threading.Lock()
+        # Serializes flushes so an older snapshot never overwrites a newer one
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.thread = None
+        self.writes = 0
+
+    def _entry(self, key, loader):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = _CacheEntry(dict(loader()))
+        return entry
+
+    def _mark_dirty(self, entry, writer):
+        if self.closed:
+            raise RuntimeError("The write-behind cache has been closed.")
+        entry.writer = writer
+        entry.version += 1
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="agent-cache-flush", daemon=True)
+            self.thread.start()
+
+    def get(self, key, loader):
+        """
+        Returns a copy of the cached state for key.
+
+        :param loader: Called without arguments to load the state on a cache miss.
+        """
+        with self.lock:
+            return dict(self._entry(key, loader).state)
+
+    def put(self, key, state, writer):
+        """
+        Replaces the cached state for key.
+
+        :param writer: Called with a snapshot of the state when the entry is flushed.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = _CacheEntry({})
+            entry.state = dict(state)
+            self._mark_dirty(entry, writer)
+
+    def update(self, key, updates, loader, writer):
+        """Merges updates into the cached state for key, loading it first on a cache miss."""
+        with self.lock:
+            entry = self._entry(key, loader)
+            entry.state.update(updates)
+            self._mark_dirty(entry, writer)
+
+    def discard(self, key):
+        """Drops key from the cache without writing pending changes."""
+        with self.flush_lock, self.lock:
+            self.entries.pop(key, None)
+
+    def flush(self, key=None):
+        """
+        Writes pending changes, for one key or for all entries.
+
+        :return: Number of entries written.
+        """
+        with self.flush_lock:
+            with self.lock:
+                keys = [key] if key is not None else list(self.entries)
+                pending = []
+                for pending_key in keys:
+                    entry = self.entries.get(pending_key)
+                    if entry is not None and entry.version != entry.flushed_version:
+                        pending.append((pending_key, entry, dict(entry.state), entry.version))
+
+            written = 0
+            error = None
+            for pending_key, entry, snapshot, version in pending:
+                try:
+                    entry.writer(snapshot)
+                except Exception as exc:
+                    logger.exception(f"Failed to flush cached state for {pending_key}")
+                    error = error or exc
+                    continue
+                with self.lock:
+                    entry.flushed_version = max(entry.flushed_version, version)
+                written += 1
+            self.writes += written
+            if error is not None:
+                raise error
+            return written
+
+    def _run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # Already logged per entry; dirty entries are retried on the next flush
+                pass
+
+    def close(self):
+        """Flushes pending changes and stops the background thread."""
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
@@ -1,30 +1,90 @@
 import json
 import os
-from utilities import save_json, load_json, ensure_directory_exists
+import shutil
+from datetime import datetime
+from utilities import save_json, load_json, ensure_directory_exists, append_log_entry, write_json_atomic
 from config import Config
+from checkpoint import QTableCheckpointer, write_model, read_model
+from agent_store import get_agent_store
+from agent_cache import get_agent_cache
+from io_executor import get_io_executor
+from agent_events import AgentJournal
 
 class AgentData:
-    def __init__(self, agent_id):
-        """Initialize the agent data object with a unique agent ID."""
+    def __init__(self, agent_id, store=None, cache=None):
+        """
+        Initialize the agent data object with a unique agent ID.
+
+        State, model and performance summaries go to an AgentStore when one is given
+        or Config.AGENT_STORE_BACKEND is 'sqlite', and to JSON files otherwise.
+        Dict models are kept in a binary file whose weights can be memory-mapped.
+        With a WriteBehindCache (given, or shared when Config.AGENT_WRITE_BEHIND is set)
+        agent state is served from memory and written back periodically; call
+        flush() or close() to persist it immediately.
+        """
         self.agent_id = agent_id
         self.data_dir = os.path.join(Config.AGENT_DATA_DIR, agent_id)
         ensure_directory_exists(self.data_dir)
         self.agent_file = os.path.join(self.data_dir, 'agent_data.json')
+        self.model_file = os.path.join(self.data_dir, 'agent_model.ckpt')
+        self.q_table_checkpointer = QTableCheckpointer(os.path.join(self.data_dir, 'checkpoints'))
+        if store is None and Config.AGENT_STORE_BACKEND == 'sqlite':
+            store = get_agent_store()
+        self.store = store
+        if cache is None and Config.AGENT_WRITE_BEHIND:
+            cache = get_agent_cache()
+        self.cache = cache
+        self.cache_key = (store.path, agent_id) if store is not None else self.agent_file
+        self.journal_dir = os.path.join(self.data_dir, 'journal')
+
+    def _read_state(self):
+        if self.store is not None:
+            return self.store.get_state(self.agent_id)
+        return load_json(self.agent_file)
+
+    def _write_state(self, state_data):
+        # Used by the write-behind cache; JSON files are replaced atomically
+        if self.store is not None:
+            self.store.set_state(self.agent_id, state_data)
+        else:
+            write_json_atomic(state_data, self.agent_file)
 
     def save_agent_state(self, state_data):
         """Save the current state of the agent."""
-        save_json(state_data, self.agent_file)
+        if self.cache is not None:
+            self.cache.put(self.cache_key, state_data, self._write_state)
+        elif self.store is not None:
+            self.store.set_state(self.agent_id, state_data)
+        else:
+            save_json(state_data, self.agent_file)
 
     def load_agent_state(self):
         """Load the current state of the agent."""
-        return load_json(self.agent_file)
+        if self.cache is not None:
+            return self.cache.get(self.cache_key, self._read_state)
+        return self._read_state()
 
     def update_agent_state(self, state_data):
         """Update the state of the agent."""
+        if self.cache is not None:
+            self.cache.update(self.cache_key, state_data, self._read_state, self._write_state)
+            return
+        if self.store is not None:
+            # Per-key upsert in one transaction; concurrent updates to other keys are kept
+            self.store.update_state(self.agent_id, state_data)
+            return
         current_state = self.load_agent_state()
         current_state.update(state_data)
         self.save_agent_state(current_state)
 
+    def save_agent_state_async(self, state_data):
+        """Queue save_agent_state on the background I/O executor; returns a Future."""
+        return get_io_executor().submit(self.save_agent_state, state_data, key=self.cache_key)
+
+    def update_agent_state_async(self, state_data):
+        """Queue update_agent_state on the background I/O executor, in order with other queued state writes."""
+        return get_io_executor().submit(self.update_agent_state, state_data, key=self.cache_key)
+
     def get_agent_summary(self):
         """Get a summary of the agent's data (e.g., performance, model status)."""
         agent_state = self.load_agent_state()
@@ -36,24 +96,83 @@ class AgentData:
         }
         return summary
 
+    def open_journal(self, snapshot_every=None):
+        """
+        Open the agent's event journal, which persists state as a log of small
+        changes plus periodic snapshots instead of rewriting it on every save.
+
+        :return: An AgentJournal whose state has been recovered from disk.
+        """
+        return AgentJournal(self.journal_dir, snapshot_every=snapshot_every)
+
+    def flush(self):
+        """Write cached changes to the agent's state to disk now."""
+        if self.cache is not None:
+            self.cache.flush(self.cache_key)
+
+    def close(self):
+        """Persist pending changes; the shared cache itself stays open for other agents."""
+        self.flush()
+
     def clear_agent_data(self):
         """Clear the agent's data."""
+        if self.cache is not None:
+            self.cache.discard(self.cache_key)
+        if self.store is not None:
+            self.store.delete_agent(self.agent_id)
         if os.path.exists(self.agent_file):
             os.remove(self.agent_file)
+        if os.path.isdir(self.journal_dir):
+            shutil.rmtree(self.journal_dir)
 
     def log_agent_performance(self):
         """Log the agent's performance to a log file."""
         agent_summary = self.get_agent_summary()
+        if self.store is not None:
+            self.store.record_summary(self.agent_id, agent_summary)
         log_file = os.path.join(Config.LOGS_DIR, f'agent_performance_{self.agent_id}.log')
-        with open(log_file, 'a') as log:
-            log.write(f"{datetime.now()} - Agent Performance: {json.dumps(agent_summary, indent=4)}\n")
+        append_log_entry(log_file, f"{datetime.now()} - Agent Performance: {json.dumps(agent_summary, indent=4)}\n")
 
     def save_agent_model(self, model_data):
-        """Save the agent's model data (e.g., weights)."""
+        """
+        Save the agent's model data (e.g., weights). A dict model is written to a
+        binary file: numeric arrays and lists of numbers as raw arrays, every
+        other value in its JSON header.
+        """
+        if isinstance(model_data, dict):
+            write_model(self.model_file, model_data)
+            return
+        if os.path.exists(self.model_file):
+            os.remove(self.model_file)
+        if self.store is not None:
+            self.store.save_model(self.agent_id, model_data)
+            return
         model_file = os.path.join(self.data_dir, 'agent_model.json')
         save_json(model_data, model_file)
 
-    def load_agent_model(self):
-        """Load the agent's model data."""
+    def save_agent_model_async(self, model_data):
+        """Queue save_agent_model on the background I/O executor; returns a Future."""
+        return get_io_executor().submit(self.save_agent_model, model_data, key=self.model_file)
+
+    def load_agent_model(self, mmap=False):
+        """
+        Load the agent's model data. Weights saved as lists come back as lists and
+        NumPy arrays as arrays; with mmap every weight is a read-only np.memmap view
+        that loads instantly and shares pages between processes.
+        """
+        if os.path.exists(self.model_file):
+            return read_model(self.model_file, mmap=mmap)
+        if self.store is not None:
+            return self.store.load_model(self.agent_id)
         model_file = os.path.join(self.data_dir, 'agent_model.json')
-        return load_json(model_file)
\ No newline at end of file
+        return load_json(model_file)
+
+    def save_q_table(self, actions, states, values, incremental=False):
+        """Save a Q-table as a binary checkpoint; incremental saves only write rows changed since the last full save."""
+        if incremental:
+            return self.q_table_checkpointer.save_delta(actions, states, values)
+        return self.q_table_checkpointer.save_full(actions, states, values)
+
+    def load_q_table(self, mmap=True):
+        """Load the latest Q-table checkpoint as (actions, states, values), or None if there is none."""
+        return self.q_table_checkpointer.load(mmap=mmap)
\ No newline at end of file
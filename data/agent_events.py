@@ -0,0 +1,195 @@
+import copy
+import os
+from config import Config
+from utilities import load_json, write_json_atomic
+from segment_log import SegmentLog
+
+# Compact event encoding: [op, path, value]
+SET, APPEND, UPDATE, DELETE = 's', 'a', 'u', 'd'
+
+# BaseAgent fields captured by AgentJournal.capture; 'state.mood' is agent.state['mood']
+AGENT_FIELDS = ('mood', 'goals', 'memory', 'communication_history', 'environment',
+                'state.mood', 'state.knowledge', 'state.goals')
+
+
+def apply_event(state, event):
+    """Applies one [op, path, value] event to a flat state dict (path -> value)."""
+    op, path, value = event
+    if op == SET:
+        state[path] = value
+    elif op == APPEND:
+        state.setdefault(path, []).append(value)
+    elif op == UPDATE:
+        state.setdefault(path, {}).update(value)
+    elif op == DELETE:
+        state.pop(path, None)
+    else:
+        raise ValueError(f"Unknown event op '{op}'")
+
+
+def _get_field(agent, path):
+    name, _, key = path.partition('.')
+    value = getattr(agent, name, None)
+    if key:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _set_field(agent, path, value):
+    name, _, key = path.partition('.')
+    if key:
+        container = getattr(agent, name, None)
+        if not isinstance(container, dict):
+            container = {}
+            setattr(agent, name, container)
+        container[key] = value
+    else:
+        setattr(agent, name, value)
+
+
+class AgentJournal:
+    """
+    Event-sourced persistence for agent state.
+
+    Every mutation is appended to a SegmentLog as a compact [op, path, value]
+    delta: set a value, append to a list, merge into a dict or delete. Every
+    snapshot_every events the full state is written to a snapshot together with
+    the sequence number of the last event it contains, and event segments older
+    than the snapshot are deleted. Recovery loads the snapshot and replays only
+    the events after it, so both the cost of persisting and the time to recover
+    follow the volume of change rather than the size of the state.
+
+    Changes can be recorded explicitly (set/append/update/delete) or detected
+    with capture(agent), which compares a BaseAgent's fields with what was
+    recorded before. Lists are treated as append-only: growth is recorded item by
+    item, anything else replaces the whole list.
+    """
+
+    def __init__(self, directory, snapshot_every=None, fields=AGENT_FIELDS):
+        """
+        Opens (or creates) a journal and recovers its state.
+
+        :param directory: Directory holding the event log and the snapshot.
+        :param snapshot_every: Events between snapshots (default: Config.EVENT_SNAPSHOT_EVERY).
+        :param fields: Agent fields that capture() and restore() handle.
+        """
+        self.directory = directory
+        self.snapshot_every = snapshot_every or Config.EVENT_SNAPSHOT_EVERY
+        self.fields = fields
+        self.snapshot_path = os.path.join(directory, 'snapshot.json')
+        self.log = SegmentLog(os.path.join(directory, 'events'),
+                              segment_bytes=Config.EVENT_SEGMENT_BYTES,
+                              fsync=Config.TRAINING_FSYNC_POLICY,
+                              fsync_interval=Config.TRAINING_FSYNC_INTERVAL)
+        self.state = {}
+        self.snapshot_seq = -1
+        self.events_since_snapshot = 0
+        # path -> (list length, last item) or value as last recorded, for capture()
+        self.captured = {}
+        self.recover()
+
+    def recover(self):
+        """Rebuilds the state from the latest snapshot plus the events after it."""
+        snapshot = load_json(self.snapshot_path)
+        self.state = snapshot.get('state', {})
+        self.snapshot_seq = snapshot.get('seq', -1)
+        self.events_since_snapshot = 0
+        for record in self.log.read(start_seq=self.snapshot_seq + 1):
+            apply_event(self.state, record['data'])
+            self.events_since_snapshot += 1
+        self.captured = {}
+        return self.state
+
+    def record(self, op, path, value=None):
+        """
+        Applies a change to the state and appends it to the journal. The value is
+        copied, so later changes to the caller's object cannot alter the journaled
+        state without an event.
+        """
+        event = [op, path, copy.deepcopy(value)]
+        apply_event(self.state, event)
+        self.log.append(event)
+        self.events_since_snapshot += 1
+        if self.events_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def set(self, path, value):
+        self.record(SET, path, value)
+
+    def append(self, path, value):
+        self.record(APPEND, path, value)
+
+    def update(self, path, values):
+        self.record(UPDATE, path, values)
+
+    def delete(self, path):
+        self.record(DELETE, path)
+
+    def snapshot(self):
+        """Writes the full state as a snapshot and drops event segments it covers."""
+        seq = self.log.next_seq - 1
+        # Events must be durable before a snapshot that claims to contain them
+        self.log.sync()
+        write_json_atomic({'seq': seq, 'state': self.state}, self.snapshot_path)
+        self.snapshot_seq = seq
+        self.events_since_snapshot = 0
+        log = self.log
+        while len(log.segments) > 1 and log.segments[1] <= seq + 1:
+            if log.drop_oldest_segment() is None:
+                break
+
+    def capture(self, agent):
+        """
+        Records the changes in an agent's fields since the last capture.
+
+        :return: Number of events recorded.
+        """
+        recorded = 0
+        for path in self.fields:
+            value = _get_field(agent, path)
+            previous = self.captured.get(path)
+            if isinstance(value, list):
+                length = len(value)
+                if previous is not None and previous[0] <= length and (
+                        previous[0] == 0 or value[previous[0] - 1] is previous[1]):
+                    for item in value[previous[0]:]:
+                        self.append(path, item)
+                        recorded += 1
+                elif previous is not None or value != self.state.get(path):
+                    self.set(path, value)
+                    recorded += 1
+                self.captured[path] = (length, value[-1] if value else None)
+            elif isinstance(value, dict):
+                known = self.state.get(path)
+                if not isinstance(known, dict):
+                    self.set(path, value)
+                    recorded += 1
+                else:
+                    changed = {key: item for key, item in value.items() if key not in known or known[key] != item}
+                    if len(known) > len(value) or any(key not in value for key in known):
+                        self.set(path, value)
+                        recorded += 1
+                    elif changed:
+                        self.update(path, changed)
+                        recorded += 1
+            elif value != self.state.get(path) or path not in self.state:
+                self.set(path, value)
+                recorded += 1
+        return recorded
+
+    def restore(self, agent):
+        """Sets an agent's fields from the recovered state."""
+        for path in self.fields:
+            if path in self.state:
+                _set_field(agent, path, copy.deepcopy(self.state[path]))
+        # The restored fields are what the journal holds; later captures only record new changes
+        self.captured = {}
+        for path in self.fields:
+            value = _get_field(agent, path)
+            if isinstance(value, list):
+                self.captured[path] = (len(value), value[-1] if value else None)
+        return agent
+
+    def close(self):
+        """Flushes the event log."""
+        self.log.close()
@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_state (
+    agent_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (agent_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agent_models (
+    agent_id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agent_summaries (
+    agent_id TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agent_summaries_by_agent ON agent_summaries (agent_id, recorded_at);
+"""
+
+UPSERT_STATE = (
+    "INSERT INTO agent_state (agent_id, key, value, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (agent_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at"
+)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_agent_store(path=None):
+    """Returns the shared AgentStore for a database path (default: Config.AGENT_STORE_PATH)."""
+    path = os.path.abspath(path or Config.AGENT_STORE_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = AgentStore(path)
+        return store
+
+
+class AgentStore:
+    """
+    Embedded SQLite store for agent state, models and performance summaries.
+
+    State is kept as one row per (agent, key), so updating a key rewrites that
+    row only. Every write runs in a transaction, so concurrent writers (threads
+    or processes) never lose each other's updates. The database runs in WAL
+    mode: readers do not block the writer and commits only append to the log.
+
+    Use transaction() to batch many writes, for any number of agents, into one
+    atomic commit:
+
+        with store.transaction():
+            store.update_state("lovis", {"mood": "happy"})
+            store.update_state("reiner", {"mood": "curious"})
+    """
+
+    def __init__(self, path, timeout=30.0):
+        """
+        Opens (or creates) the database.
+
+        :param path: Database file path.
+        :param timeout: Seconds to wait for another writer's lock before failing.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; transactions are managed explicitly in transaction()
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.depth = 0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the enclosed writes as one atomic transaction, and other threads wait
+        until it is committed. A nested call runs inside a savepoint of the
+        outermost transaction: if its block raises, only its own writes are rolled
+        back, so a caller that catches the error commits the rest without them.
+        """
+        with self.lock:
+            savepoint = f"level_{self.depth}"
+            if self.depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+            else:
+                self.connection.execute(f"SAVEPOINT {savepoint}")
+            self.depth += 1
+            try:
+                yield self.connection
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.connection.execute("ROLLBACK")
+                else:
+                    self.connection.execute(f"ROLLBACK TO {savepoint}")
+                    self.connection.execute(f"RELEASE {savepoint}")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.execute("COMMIT")
+            else:
+                self.connection.execute(f"RELEASE {savepoint}")
+
+    def get_state(self, agent_id):
+        """Returns the agent's state as a dict (empty if nothing is stored)."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, value FROM agent_state WHERE agent_id = ?", (agent_id,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def get_value(self, agent_id, key, default=None):
+        """Returns a single state value."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM agent_state WHERE agent_id = ? AND key = ?", (agent_id, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, agent_id, state):
+        """Replaces the agent's whole state."""
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM agent_state WHERE agent_id = ?", (agent_id,))
+            self._write_keys(connection, agent_id, state)
+
+    def update_state(self, agent_id, updates):
+        """Sets the given keys of the agent's state, leaving the others untouched."""
+        with self.transaction() as connection:
+            self._write_keys(connection, agent_id, updates)
+
+    def update_states(self, updates):
+        """
+        Updates several agents in one transaction.
+
+        :param updates: Dict of agent_id -> {key: value}.
+        """
+        with self.transaction() as connection:
+            for agent_id, agent_updates in updates.items():
+                self._write_keys(connection, agent_id, agent_updates)
+
+    def _write_keys(self, connection, agent_id, values):
+        now = time.time()
+        connection.executemany(UPSERT_STATE, [
+            (agent_id, key, json.dumps(value, separators=(',', ':')), now) for key, value in values.items()
+        ])
+
+    def delete_agent(self, agent_id):
+        """Removes the agent's state and model."""
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM agent_state WHERE agent_id = ?", (agent_id,))
+            connection.execute("DELETE FROM agent_models WHERE agent_id = ?", (agent_id,))
+
+    def save_model(self, agent_id, model_data):
+        """Stores the agent's model data."""
+        with self.transaction() as connection:
+            connection.execute(
+                "INSERT INTO agent_models (agent_id, model, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (agent_id) DO UPDATE SET model = excluded.model, updated_at = excluded.updated_at",
+                (agent_id, json.dumps(model_data, separators=(',', ':')), time.time()))
+
+    def load_model(self, agent_id):
+        """Returns the agent's model data (empty dict if none is stored)."""
+        with self.lock:
+            row = self.connection.execute("SELECT model FROM agent_models WHERE agent_id = ?", (agent_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def record_summary(self, agent_id, summary):
+        """Appends a performance summary to the agent's history."""
+        with self.transaction() as connection:
+            connection.execute("INSERT INTO agent_summaries (agent_id, recorded_at, summary) VALUES (?, ?, ?)",
+                               (agent_id, time.time(), json.dumps(summary, separators=(',', ':'))))
+
+    def get_summaries(self, agent_id, limit=None):
+        """Returns (recorded_at, summary) pairs for the agent, newest first."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT recorded_at, summary FROM agent_summaries WHERE agent_id = ? "
+                "ORDER BY recorded_at DESC LIMIT ?", (agent_id, -1 if limit is None else limit)).fetchall()
+        return [(recorded_at, json.loads(summary)) for recorded_at, summary in rows]
+
+    def close(self):
+        """Closes the database connection."""
+        with self.lock:
+            self.connection.close()
+        with _stores_lock:
+            if _stores.get(os.path.abspath(self.path)) is self:
+                del _stores[os.path.abspath(self.path)]
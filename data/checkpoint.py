@@ -0,0 +1,320 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# File layout: magic, header length, JSON header, then 64-byte aligned raw arrays
+MAGIC = b'ECKP'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<4sI')
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_checkpoint(path, arrays, metadata=None):
+    """
+    Writes named arrays to a binary checkpoint file. Each array is stored as
+    contiguous raw bytes at an aligned offset described in a small JSON header,
+    so it can be memory-mapped on load. The file is written to a temporary path
+    and renamed into place, so readers never see a partial checkpoint.
+
+    :param path: Destination file path.
+    :param arrays: Dict of name -> numpy array.
+    :param metadata: Optional JSON-serializable dict stored in the header.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'metadata': metadata or {},
+        'arrays': layout,
+    }, separators=(',', ':')).encode()
+    data_start = _align(PREAMBLE.size + len(header))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(PREAMBLE.pack(MAGIC, len(header)))
+        checkpoint_file.write(header)
+        for name, array in arrays.items():
+            checkpoint_file.seek(data_start + layout[name]['offset'])
+            checkpoint_file.write(memoryview(array).cast('B'))
+        checkpoint_file.truncate(data_start + offset)
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path, mmap=True):
+    """
+    Reads a checkpoint written by write_checkpoint.
+
+    :param path: Checkpoint file path.
+    :param mmap: Return read-only np.memmap views instead of loading into memory.
+    :return: (metadata, arrays) where arrays is a dict of name -> array.
+    """
+    with open(path, 'rb') as checkpoint_file:
+        magic, header_length = PREAMBLE.unpack(checkpoint_file.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Echo Network checkpoint.")
+        header = json.loads(checkpoint_file.read(header_length))
+        if header['version'] > FORMAT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {header['version']} in {path}.")
+
+        data_start = _align(PREAMBLE.size + header_length)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            offset = data_start + spec['offset']
+            if mmap and int(np.prod(shape)) > 0:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                checkpoint_file.seek(offset)
+                count = int(np.prod(shape))
+                arrays[name] = np.fromfile(checkpoint_file, dtype=dtype, count=count).reshape(shape)
+    return header['metadata'], arrays
+
+
+def encode_states(states):
+    """
+    Encodes Q-table states for a checkpoint. Tuples of integers of a common length
+    (such as grid coordinates) become an int64 array; anything else is kept as a
+    JSON list in the header.
+
+    :return: (array or None, metadata dict)
+    """
+    states = list(states)
+    if states and isinstance(states[0], tuple):
+        try:
+            # One C-level conversion; ragged or non-numeric states raise or give a non-int dtype
+            array = np.array(states)
+        except ValueError:
+            array = None
+        if array is not None and array.ndim == 2 and array.dtype.kind in 'iu':
+            return array.astype(np.int64, copy=False), {'state_encoding': 'int_tuples'}
+    return None, {'state_encoding': 'json', 'states': [list(s) if isinstance(s, tuple) else s for s in states]}
+
+
+def decode_states(metadata, arrays):
+    """Inverse of encode_states."""
+    if metadata['state_encoding'] == 'int_tuples':
+        return list(map(tuple, np.asarray(arrays['states']).tolist()))
+    return [tuple(s) if isinstance(s, list) else s for s in metadata['states']]
+
+
+class QTableCheckpointer:
+    """
+    Full and incremental binary checkpoints for an array-backed Q-table.
+
+    A full checkpoint stores the actions, the states and the complete value array.
+    A delta checkpoint stores only the rows that differ from the last full
+    checkpoint (changed rows plus newly added states). Deltas are cumulative, so
+    loading needs at most one full checkpoint and the latest delta. Changed rows
+    are found by comparing against the memory-mapped full checkpoint, so the
+    learning loop never has to track dirty rows. A delta is only written while the
+    table still starts with the full checkpoint's states in the same order;
+    otherwise a new full checkpoint is written.
+    """
+
+    def __init__(self, directory, name='q_table'):
+        """
+        Initializes the checkpointer.
+
+        :param directory: Directory holding the checkpoint files.
+        :param name: Base name of the checkpoint files.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.full_path = os.path.join(directory, f'{name}.ckpt')
+        self.delta_path = os.path.join(directory, f'{name}.delta.ckpt')
+        self.base_values = None
+        self.base_states = None
+        self.base_generation = 0
+        if os.path.exists(self.full_path):
+            metadata, arrays = read_checkpoint(self.full_path)
+            self.base_values = arrays['values']
+            self.base_states = decode_states(metadata, arrays)
+            self.base_generation = metadata['generation']
+
+    def save_full(self, actions, states, values):
+        """
+        Writes a full checkpoint and discards the previous delta.
+
+        :param actions: List of action names (the value columns).
+        :param states: List of states, one per value row.
+        :param values: Array of shape (len(states), len(actions)).
+        """
+        values = np.asarray(values)[:len(states)]
+        state_array, metadata = encode_states(states)
+        metadata.update({'actions': list(actions), 'generation': self.base_generation + 1})
+        arrays = {'values': values}
+        if state_array is not None:
+            arrays['states'] = state_array
+
+        write_checkpoint(self.full_path, arrays, metadata)
+        if os.path.exists(self.delta_path):
+            os.remove(self.delta_path)
+        self.base_generation += 1
+        self.base_values = read_checkpoint(self.full_path)[1]['values']
+        self.base_states = list(states)
+        return self.full_path
+
+    def save_delta(self, actions, states, values):
+        """
+        Writes a delta checkpoint holding the rows changed since the last full
+        checkpoint. Falls back to a full checkpoint if none exists yet, or if the
+        table lost rows or no longer starts with the full checkpoint's states
+        (e.g. after being rebuilt by a merge), since rows are matched by position.
+        """
+        base_rows = len(self.base_values) if self.base_values is not None else 0
+        if (self.base_values is None or len(states) < base_rows
+                or list(states[:base_rows]) != self.base_states):
+            return self.save_full(actions, states, values)
+
+        values = np.asarray(values)[:len(states)]
+        changed = np.flatnonzero(np.any(values[:base_rows] != self.base_values, axis=1))
+        rows = np.concatenate((changed, np.arange(base_rows, len(states), dtype=np.int64)))
+
+        new_states = states[base_rows:]
+        state_array, metadata = encode_states(new_states)
+        metadata.update({
+            'actions': list(actions),
+            'base_generation': self.base_generation,
+            'total_rows': len(states),
+        })
+        arrays = {'rows': rows.astype(np.int64), 'values': values[rows]}
+        if state_array is not None:
+            arrays['states'] = state_array
+
+        write_checkpoint(self.delta_path, arrays, metadata)
+        return self.delta_path
+
+    def load(self, mmap=True):
+        """
+        Loads the latest checkpoint.
+
+        :param mmap: Memory-map the full checkpoint. The values stay a read-only
+                     memmap unless a delta has to be applied on top of them.
+        :return: (actions, states, values), or None if nothing has been saved.
+        """
+        if not os.path.exists(self.full_path):
+            return None
+        metadata, arrays = read_checkpoint(self.full_path, mmap=mmap)
+        actions = metadata['actions']
+        states = decode_states(metadata, arrays)
+        values = arrays['values']
+
+        if os.path.exists(self.delta_path):
+            delta_metadata, delta_arrays = read_checkpoint(self.delta_path, mmap=False)
+            if delta_metadata['base_generation'] == metadata['generation']:
+                merged = np.zeros((delta_metadata['total_rows'], len(actions)), dtype=values.dtype)
+                merged[:len(values)] = values
+                merged[delta_arrays['rows']] = delta_arrays['values']
+                states = states + decode_states(delta_metadata, delta_arrays)
+                values = merged
+        return actions, states, values
+
+
+def _as_weight_array(value):
+    """Returns value as a numeric array if it is one (or a rectangular list of numbers), else None."""
+    if isinstance(value, np.ndarray):
+        return value if value.dtype.kind in 'biufc' else None
+    if not isinstance(value, list) or not value:
+        return None
+    try:
+        array = np.array(value)
+    except ValueError:
+        return None
+    if array.dtype.kind not in 'iuf':
+        return None
+    # Lists mixing ints and floats would come back as floats only; keep them as JSON
+    if array.dtype.kind == 'f' and not all(type(item) is float for item in np.array(value, dtype=object).flat):
+        return None
+    return array
+
+
+def _model_key(key):
+    """Converts a model dict key to the string the JSON model format would have used."""
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    raise TypeError(f"Model keys must be str, int, float, bool or None, not {type(key).__name__}.")
+
+
+def write_model(path, model_data):
+    """
+    Writes a model dict as a checkpoint: numeric arrays (NumPy arrays or
+    rectangular lists of numbers) are stored as raw arrays, all other values go
+    into the JSON header. Non-string keys are converted to strings as json.dumps
+    does, so they load back as strings.
+    """
+    arrays = {}
+    fields = {}
+    lists = []
+    order = []
+    for key, value in model_data.items():
+        name = _model_key(key)
+        if name in fields or name in arrays:
+            raise ValueError(f"Model keys {key!r} and {name!r} collide once converted to strings.")
+        order.append(name)
+        array = _as_weight_array(value)
+        if array is None:
+            fields[name] = value
+        else:
+            arrays[name] = array
+            if isinstance(value, list):
+                lists.append(name)
+    write_checkpoint(path, arrays, {'fields': fields, 'order': order, 'lists': lists})
+
+
+def read_model(path, mmap=False):
+    """
+    Reads a model dict written by write_model, in its original key order.
+
+    :param mmap: Return every stored weight, including ones saved as lists, as a
+                 read-only np.memmap view, so loading is near-instant and
+                 processes loading the same model share pages. By default
+                 weights are loaded into memory and values saved as lists come
+                 back as lists.
+    """
+    metadata, arrays = read_checkpoint(path, mmap=mmap)
+    fields = metadata['fields']
+    if not mmap:
+        for name in metadata.get('lists', []):
+            arrays[name] = arrays[name].tolist()
+    return {name: arrays[name] if name in arrays else fields[name] for name in metadata['order']}
+
+
+# Example usage: round-trip a model and check that it comes back unchanged
+if __name__ == "__main__":
+    import tempfile
+
+    model = {
+        'weights': np.arange(12, dtype=np.float32).reshape(3, 4),
+        'bias': [0.5, -0.25, 1.0],
+        'layer_sizes': [4, 3],
+        'mixed': [1, 2.5],
+        1: 'int key',
+        'config': {'activation': 'relu'},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.ckpt')
+        write_model(path, model)
+        loaded = read_model(path)
+        assert list(loaded) == ['weights', 'bias', 'layer_sizes', 'mixed', '1', 'config']
+        assert np.array_equal(loaded['weights'], model['weights']) and loaded['weights'].dtype == np.float32
+        for name in ('bias', 'layer_sizes', 'mixed'):
+            assert loaded[name] == model[name] and type(loaded[name]) is list
+        assert loaded['1'] == 'int key' and loaded['config'] == model['config']
+        mapped = read_model(path, mmap=True)
+        assert isinstance(mapped['bias'], np.memmap) and mapped['bias'].tolist() == model['bias']
+        del mapped
+    print("Model round-trip OK")
@@ -0,0 +1,267 @@
+import json
+import os
+from functools import reduce
+from itertools import chain, islice
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+MANIFEST_NAME = 'manifest.json'
+FORMATS = ('npz', 'parquet')
+# Metadata columns; step fields starting with an underscore get one more, so they never collide
+SEQ_COLUMN = '_seq'
+TIME_COLUMN = '_time'
+
+
+def field_column(field):
+    """Returns the column name under which a step field is exported."""
+    return f'_{field}' if field.startswith('_') else field
+
+
+def _column_array(values):
+    """
+    Converts one column of a chunk to (values array, valid mask). Missing
+    entries are None. Bools, ints, floats and strings get native dtypes; any
+    other value (lists, dicts, mixed types) is stored as its JSON encoding.
+    """
+    valid = np.array([value is not None for value in values], dtype=np.bool_)
+    present = [value for value in values if value is not None]
+    kinds = {bool if isinstance(value, bool) else
+             int if isinstance(value, int) else
+             float if isinstance(value, float) else
+             str if isinstance(value, str) else object for value in present}
+
+    if kinds == {bool}:
+        return np.array([bool(value) for value in values], dtype=np.bool_), valid
+    if kinds == {int}:
+        return np.array([0 if value is None else value for value in values], dtype=np.int64), valid
+    if kinds and kinds <= {int, float}:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64), valid
+    if kinds == {str}:
+        return np.array(['' if value is None else value for value in values], dtype=np.str_), valid
+    return np.array(['' if value is None else json.dumps(value) for value in values], dtype=np.str_), valid
+
+
+def _promote(first, second):
+    """
+    Returns the dtype (as a string) that holds both column dtypes: bool < int <
+    float among numbers, and text for anything mixed with text.
+    """
+    first, second = np.dtype(first), np.dtype(second)
+    if first.kind == 'U' or second.kind == 'U':
+        return np.dtype(np.str_).str
+    return np.result_type(first, second).str
+
+
+def _column_dtype(entry):
+    # Exports from older versions list one dtype per chunk
+    return entry if isinstance(entry, str) else reduce(_promote, entry)
+
+
+def _write_chunk(directory, index, columns, file_format):
+    arrays = {name: _column_array(values) for name, values in columns.items()}
+    if file_format == 'parquet':
+        table = pa.table({name: pa.array(values, mask=~valid) for name, (values, valid) in arrays.items()})
+        pq.write_table(table, os.path.join(directory, f'chunk_{index:06d}.parquet'))
+    else:
+        for name, (values, valid) in arrays.items():
+            column_dir = os.path.join(directory, 'columns', name)
+            os.makedirs(column_dir, exist_ok=True)
+            np.savez(os.path.join(column_dir, f'chunk_{index:06d}.npz'), values=values, valid=valid)
+    return {name: np.dtype(np.str_).str if values.dtype.kind == 'U' else values.dtype.str
+            for name, (values, _) in arrays.items()}
+
+
+def _new_rows(training_data, manifest):
+    """
+    Yields (seq, time, step, legacy filename) for every step the export does not
+    hold yet: legacy step files it has not listed, then log records after its
+    last_seq. Legacy steps have seq None and log records filename None.
+    """
+    exported = set(manifest['legacy_files'])
+    legacy = ((None, saved_at, step, filename)
+              for filename, saved_at, step in training_data.iter_legacy_steps(skip=exported))
+    # start_seq=0 leaves the legacy files to the generator above
+    start_seq = 0 if manifest['last_seq'] is None else manifest['last_seq'] + 1
+    records = ((seq, saved_at, step, None)
+               for seq, saved_at, step in training_data.iter_training_steps(start_seq=start_seq, with_metadata=True))
+    return chain(legacy, records)
+
+
+def export_training_history(training_data, directory, chunk_size=100000, file_format='npz'):
+    """
+    Exports the training steps of a TrainingData object to a columnar layout.
+
+    Steps are streamed in sequence order and split into chunks of chunk_size
+    rows. Every top-level key of the step dicts becomes a column (see
+    field_column()), next to the '_seq' and '_time' metadata columns; steps from
+    legacy step files have a '_seq' of -1. With the 'npz' format each column of
+    each chunk is its own columns/<name>/chunk_<n>.npz file; with 'parquet'
+    (needs pyarrow) each chunk is one Parquet file. A manifest lists the chunks,
+    their sequence ranges and one dtype per column, promoted when a later chunk
+    needs a wider one (e.g. int to float); readers cast every chunk to it.
+
+    Exports are incremental: running again on the same directory only appends
+    the steps saved since the last export. Exported legacy step files are listed
+    in the manifest, so they are not exported twice.
+
+    :return: The manifest dict.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{file_format}'; expected one of {FORMATS}.")
+    if file_format == 'parquet' and pq is None:
+        raise ImportError("Parquet export requires pyarrow.")
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest['format'] != file_format:
+            raise ValueError(f"{directory} already holds a '{manifest['format']}' export.")
+        if 'legacy_files' not in manifest:
+            raise ValueError(f"{directory} holds an export from an older version (metadata columns "
+                             f"'seq'/'time'); export to a new directory instead.")
+    else:
+        manifest = {'format': file_format, 'columns': {}, 'chunks': [], 'last_seq': None, 'legacy_files': []}
+
+    rows = _new_rows(training_data, manifest)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        fields = {}
+        for _, _, step, _ in batch:
+            if isinstance(step, dict):
+                fields.update(dict.fromkeys(step))
+        columns = {
+            SEQ_COLUMN: [-1 if seq is None else seq for seq, _, _, _ in batch],
+            TIME_COLUMN: [saved_at for _, saved_at, _, _ in batch],
+        }
+        for field in fields:
+            columns[field_column(field)] = [step.get(field) if isinstance(step, dict) else None
+                                            for _, _, step, _ in batch]
+
+        index = len(manifest['chunks'])
+        dtypes = _write_chunk(directory, index, columns, file_format)
+        for name, dtype in dtypes.items():
+            known = manifest['columns'].get(name)
+            manifest['columns'][name] = dtype if known is None else _promote(known, dtype)
+        manifest['legacy_files'].extend(filename for _, _, _, filename in batch if filename is not None)
+        seqs = [seq for seq in columns[SEQ_COLUMN] if seq >= 0]
+        manifest['chunks'].append({
+            'index': index,
+            'rows': len(batch),
+            'columns': list(columns),
+            'first_seq': seqs[0] if seqs else None,
+            'last_seq': seqs[-1] if seqs else None,
+        })
+        if seqs:
+            manifest['last_seq'] = seqs[-1]
+
+        # The manifest is the commit point: chunks it does not list are ignored
+        temp_path = f'{manifest_path}.tmp'
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temp_path, manifest_path)
+    return manifest
+
+
+class ColumnarHistory:
+    """
+    Reads an export written by export_training_history one column at a time,
+    without touching the other columns.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), 'r') as manifest_file:
+            self.manifest = json.load(manifest_file)
+
+    @property
+    def columns(self):
+        """Names of all exported columns."""
+        return list(self.manifest['columns'])
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.manifest['chunks'])
+
+    def iter_column(self, name, with_valid=False):
+        """
+        Yields the column one chunk at a time as NumPy arrays, all of the
+        column's dtype from the manifest. Rows without the field hold NaN in
+        float columns, 0/False in int/bool columns and empty strings in text
+        columns.
+
+        :param with_valid: Yield (values, valid) pairs, where valid marks the rows
+                           that actually had the field.
+        """
+        if name not in self.manifest['columns']:
+            raise KeyError(f"No column '{name}' in {self.directory}.")
+        dtype = np.dtype(_column_dtype(self.manifest['columns'][name]))
+        missing = np.nan if dtype.kind == 'f' else '' if dtype.kind == 'U' else 0
+        for chunk in self.manifest['chunks']:
+            if name not in chunk['columns']:
+                values = np.full(chunk['rows'], missing, dtype=dtype)
+                valid = np.zeros(chunk['rows'], dtype=np.bool_)
+            elif self.manifest['format'] == 'parquet':
+                path = os.path.join(self.directory, f"chunk_{chunk['index']:06d}.parquet")
+                column = pq.read_table(path, columns=[name]).column(0)
+                valid = column.is_valid().to_numpy(zero_copy_only=False)
+                values = column.to_numpy(zero_copy_only=False)
+            else:
+                path = os.path.join(self.directory, 'columns', name, f"chunk_{chunk['index']:06d}.npz")
+                with np.load(path) as arrays:
+                    values, valid = arrays['values'], arrays['valid']
+            if values.dtype != dtype:
+                # An earlier chunk of a promoted column, or Parquet's own types
+                values = np.where(valid, values, missing).astype(dtype)
+            yield (values, valid) if with_valid else values
+
+    def read_column(self, name):
+        """Returns the whole column as one NumPy array."""
+        chunks = list(self.iter_column(name))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=_column_dtype(self.manifest['columns'][name]))
+
+
+# Round-trip check: legacy files, a promoted column, a colliding field name and both formats
+if __name__ == "__main__":
+    import tempfile
+
+    from config import Config
+    from training_data import TrainingData
+
+    with tempfile.TemporaryDirectory() as root:
+        Config.AGENT_DATA_DIR = root
+        legacy_dir = os.path.join(root, 'export_check', 'training')
+        os.makedirs(legacy_dir)
+        with open(os.path.join(legacy_dir, 'step_20240101000000000000.json'), 'w') as step_file:
+            json.dump({'reward': 1, 'seq': 'legacy'}, step_file)
+        training_data = TrainingData('export_check')
+        for reward in (2, 3):
+            training_data.save_training_step({'reward': reward, 'seq': 'log'})
+
+        formats = FORMATS if pq is not None else ('npz',)
+        if pq is None:
+            print("pyarrow not installed; skipping the Parquet export")
+        for file_format in formats:
+            directory = os.path.join(root, file_format)
+            export_training_history(training_data, directory, chunk_size=2, file_format=file_format)
+            # Nothing new: the legacy file must not be exported again
+            export_training_history(training_data, directory, chunk_size=2, file_format=file_format)
+        training_data.save_training_step({'reward': 4.5, 'seq': 'log'})
+        for file_format in formats:
+            directory = os.path.join(root, file_format)
+            export_training_history(training_data, directory, chunk_size=2, file_format=file_format)
+            history = ColumnarHistory(directory)
+            assert len(history) == 4, len(history)
+            assert history.read_column(SEQ_COLUMN).tolist() == [-1, 0, 1, 2]
+            assert history.read_column('reward').tolist() == [1.0, 2.0, 3.0, 4.5]
+            assert history.read_column('reward').dtype == np.float64
+            assert history.read_column('seq').tolist() == ['legacy', 'log', 'log', 'log']
+        training_data.close()
+    print("Columnar export round-trip OK")
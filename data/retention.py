@@ -0,0 +1,286 @@
+import fnmatch
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from config import Config
+from utilities import file_lock
+from training_data import legacy_step_time
+
+logger = logging.getLogger(__name__)
+
+# Entries in agent_performance_*.log and training_progress_*.log start with str(datetime.now())
+LOG_ENTRY_START = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?) - ')
+DEFAULT_LOG_PATTERNS = ('agent_performance_*.log', 'training_progress_*.log')
+
+
+class RetentionPolicy:
+    """
+    Limits on how much history is kept. Every limit is optional; history is
+    removed oldest first until all of the given limits are met.
+
+    :param max_age: Seconds after which history is deleted.
+    :param max_bytes: Maximum size of a training step log or of a log file.
+    :param keep_last: Maximum number of training steps or log entries kept.
+    :param downsample_after: Seconds after which training steps are thinned out.
+    :param downsample_factor: Keep one in this many steps once they are thinned.
+    """
+
+    def __init__(self, max_age=None, max_bytes=None, keep_last=None, downsample_after=None, downsample_factor=10):
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.keep_last = keep_last
+        self.downsample_after = downsample_after
+        self.downsample_factor = downsample_factor
+
+    @classmethod
+    def from_config(cls):
+        """Builds the policy from the DATA_RETENTION_* settings in Config."""
+        return cls(
+            max_age=Config.DATA_RETENTION_MAX_AGE,
+            max_bytes=Config.DATA_RETENTION_MAX_BYTES,
+            keep_last=Config.DATA_RETENTION_KEEP_LAST,
+            downsample_after=Config.DATA_DOWNSAMPLE_AFTER,
+            downsample_factor=Config.DATA_DOWNSAMPLE_FACTOR,
+        )
+
+
+def apply_segment_retention(log, policy, now=None):
+    """
+    Drops the oldest sealed segments of a SegmentLog that are past the policy's
+    limits.
+
+    :return: Number of records deleted.
+    """
+    now = time.time() if now is None else now
+    deleted = 0
+    segments = log.sealed_segments()
+    total_bytes = sum(size for _, _, size, _ in segments)
+    if log.segments:
+        total_bytes += os.path.getsize(log.segment_path(log.segments[-1]))
+
+    for _, records, size, modified in segments:
+        too_old = policy.max_age is not None and now - modified > policy.max_age
+        too_big = policy.max_bytes is not None and total_bytes > policy.max_bytes
+        # Whole segments only: drop one if the newer ones still hold keep_last records
+        too_many = policy.keep_last is not None and log.count - records >= policy.keep_last
+        if not (too_old or too_big or too_many):
+            break
+        dropped = log.drop_oldest_segment()
+        if dropped is None:
+            break
+        deleted += dropped
+        total_bytes -= size
+    return deleted
+
+
+def downsample_segments(log, policy, now=None, limit=None):
+    """
+    Thins out sealed segments older than policy.downsample_after, keeping the
+    records whose sequence number is a multiple of policy.downsample_factor.
+    Each segment is rewritten at most once.
+
+    :param limit: Maximum number of segments to rewrite in this call.
+    :return: Number of segments rewritten.
+    """
+    if policy.downsample_after is None or policy.downsample_factor <= 1:
+        return 0
+    now = time.time() if now is None else now
+    factor = policy.downsample_factor
+    rewritten = 0
+    for first_seq, _, _, modified in log.sealed_segments():
+        if limit is not None and rewritten >= limit:
+            break
+        if first_seq in log.dropped or now - modified <= policy.downsample_after:
+            continue
+        if log.rewrite_segment(first_seq, lambda record: record['seq'] % factor == 0) is not None:
+            rewritten += 1
+    return rewritten
+
+
+def merge_small_segments(log, limit=None):
+    """
+    Merges runs of neighbouring sealed segments that together still fit in one
+    segment, such as segments shrunk by downsampling. Only segments in the same
+    downsampling state are merged, so thinned and full history never mix.
+
+    :param limit: Maximum number of merges in this call.
+    :return: Number of merges.
+    """
+    merges = 0
+    run = []
+    run_bytes = 0
+    for first_seq, _, size, _ in log.sealed_segments() + [(None, 0, 0, 0)]:
+        same_state = run and (first_seq in log.dropped) == (run[0] in log.dropped)
+        if first_seq is not None and same_state and run_bytes + size <= log.segment_bytes:
+            run.append(first_seq)
+            run_bytes += size
+            continue
+        if len(run) > 1 and log.merge_segments(run):
+            merges += 1
+            if limit is not None and merges >= limit:
+                break
+        run, run_bytes = ([first_seq], size) if first_seq is not None else ([], 0)
+    return merges
+
+
+def trim_log_file(path, policy, now=None):
+    """
+    Removes the oldest entries of a timestamped log file (such as
+    agent_performance_<id>.log) that are past the policy's limits, by writing
+    the kept entries aside and renaming them into place. The file's file_lock is
+    held throughout, so entries written with append_log_entry wait instead of
+    going to the replaced file.
+
+    :return: Number of bytes removed.
+    """
+    with file_lock(path):
+        return _trim_log_file(path, policy, time.time() if now is None else now)
+
+
+def _trim_log_file(path, policy, now):
+    with open(path, 'rb') as log_file:
+        data = log_file.read()
+
+    # Byte offset and timestamp of every entry
+    entries = []
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        match = LOG_ENTRY_START.match(line)
+        if match:
+            try:
+                stamp = datetime.fromisoformat(match.group(1).decode()).timestamp()
+            except ValueError:
+                stamp = None
+            entries.append((offset, stamp))
+        offset += len(line)
+    if not entries:
+        return 0
+
+    cut = 0
+    for index, (entry_offset, stamp) in enumerate(entries):
+        too_old = policy.max_age is not None and stamp is not None and now - stamp > policy.max_age
+        too_big = policy.max_bytes is not None and len(data) - entry_offset > policy.max_bytes
+        too_many = policy.keep_last is not None and len(entries) - index > policy.keep_last
+        if not (too_old or too_big or too_many):
+            break
+        cut = entries[index + 1][0] if index + 1 < len(entries) else len(data)
+    if cut == 0:
+        return 0
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as temp_file:
+        temp_file.write(data[cut:])
+    os.replace(temp_path, path)
+    return cut
+
+
+def apply_legacy_retention(training_data, policy, now=None):
+    """
+    Deletes the oldest step_<timestamp>.json files of a TrainingData (steps saved
+    before the step log existed) that are past the policy's age or keep_last
+    limits; keep_last counts them together with the step log. These files are
+    only deleted, never merged or downsampled.
+
+    :return: Number of files deleted.
+    """
+    now = time.time() if now is None else now
+    legacy_files = training_data.legacy_files
+    total = len(legacy_files) + training_data.step_log.count
+    deleted = 0
+    for filename in legacy_files:
+        stamp = legacy_step_time(filename)
+        too_old = policy.max_age is not None and stamp is not None and now - stamp > policy.max_age
+        too_many = policy.keep_last is not None and total - deleted > policy.keep_last
+        if not (too_old or too_many):
+            break
+        path = os.path.join(training_data.data_dir, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        deleted += 1
+    training_data.legacy_files = legacy_files[deleted:]
+    return deleted
+
+
+class DataCompactor:
+    """
+    Background maintenance for training step logs and agent log files.
+
+    Each pass applies the retention policy to every registered TrainingData
+    (step log and legacy step files), downsamples old history, merges small segments and trims the log files in
+    logs_dir. Passes do a bounded amount of work (max_rewrites segment rewrites
+    or merges per log) and only touch sealed segments, so save_training_step is
+    never blocked for more than a rename. Run passes by hand with run_once(),
+    or every interval seconds on a daemon thread with start()/stop().
+    """
+
+    def __init__(self, policy=None, interval=None, logs_dir=None, log_patterns=DEFAULT_LOG_PATTERNS, max_rewrites=4):
+        self.policy = policy or RetentionPolicy.from_config()
+        self.interval = Config.DATA_COMPACTION_INTERVAL if interval is None else interval
+        self.logs_dir = logs_dir or Config.LOGS_DIR
+        self.log_patterns = log_patterns
+        self.max_rewrites = max_rewrites
+        self.training_data = []
+        self.log_mtimes = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def register(self, training_data):
+        """Adds a TrainingData object whose step log should be maintained."""
+        self.training_data.append(training_data)
+
+    def unregister(self, training_data):
+        """Stops maintaining a TrainingData object."""
+        self.training_data.remove(training_data)
+
+    def run_once(self):
+        """
+        Runs one maintenance pass.
+
+        :return: Counts of deleted records, rewritten and merged segments, and
+                 bytes trimmed from log files.
+        """
+        now = time.time()
+        stats = {'deleted_records': 0, 'downsampled_segments': 0, 'merged_segments': 0, 'trimmed_log_bytes': 0}
+        for training_data in list(self.training_data):
+            log = training_data.step_log
+            stats['deleted_records'] += apply_legacy_retention(training_data, self.policy, now)
+            stats['deleted_records'] += apply_segment_retention(log, self.policy, now)
+            stats['downsampled_segments'] += downsample_segments(log, self.policy, now, self.max_rewrites)
+            stats['merged_segments'] += merge_small_segments(log, self.max_rewrites)
+
+        if os.path.isdir(self.logs_dir):
+            for filename in os.listdir(self.logs_dir):
+                if not any(fnmatch.fnmatch(filename, pattern) for pattern in self.log_patterns):
+                    continue
+                path = os.path.join(self.logs_dir, filename)
+                mtime = os.path.getmtime(path)
+                # Unchanged files only need another look once entries can have aged out
+                if self.log_mtimes.get(path) == mtime and self.policy.max_age is None:
+                    continue
+                stats['trimmed_log_bytes'] += trim_log_file(path, self.policy, now)
+                self.log_mtimes[path] = os.path.getmtime(path)
+        return stats
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Data compaction pass failed")
+
+    def start(self):
+        """Starts running passes in the background."""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="data-compactor", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stops the background passes, waiting for a running pass to finish."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,599 @@
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the single-writer check is skipped there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'segment_'
+SEGMENT_SUFFIX = '.ndjson'
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'writer.lock'
+FSYNC_POLICIES = ('always', 'interval', 'never')
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+
+
+def _segment_name(first_seq):
+    return f'{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}'
+
+
+def _parse_record(line):
+    """Returns the record stored on one log line, or None if the line is damaged."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) and 'seq' in record else None
+
+
+def _line_start(log_file, end, chunk_size=65536):
+    """Returns the offset at which the line ending at `end` starts, reading backwards."""
+    position = end
+    while position > 0:
+        read_from = max(0, position - chunk_size)
+        log_file.seek(read_from)
+        newline = log_file.read(position - read_from).rfind(b'\n')
+        if newline >= 0:
+            return read_from + newline + 1
+        position = read_from
+    return 0
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_segment_log(directory, **kwargs):
+    """
+    Returns the shared SegmentLog for a directory, opening it with kwargs if this
+    process has not opened it yet.
+    """
+    directory = os.path.abspath(directory)
+    with _logs_lock:
+        log = _logs.get(directory)
+        if log is None:
+            log = _logs[directory] = SegmentLog(directory, **kwargs)
+        return log
+
+
+class SegmentLog:
+    """
+    Append-only record log split into size-bounded segment files.
+
+    Every record is one line of compact JSON, {"seq": n, "time": t, "data": ...},
+    where seq is a sequence number that increases by one per record. Records are
+    appended to the newest segment; once it reaches segment_bytes a new segment
+    is started, named after the sequence number of its first record, so a few
+    files hold millions of records.
+
+    Durability follows the fsync policy: 'always' syncs after every record,
+    'interval' at most once per fsync_interval seconds, and 'never' leaves it to
+    the operating system. When the log is opened, a torn or corrupt tail left by
+    a crash is truncated back to the last intact record.
+
+    A manifest file records the next sequence number, the record count and the
+    segment and byte offset of the newest record. It is rewritten atomically on
+    rollover, on close and at most once per fsync_interval, so opening the log
+    only has to check the records appended since, and the newest record and the
+    count are available in O(1) however long the log gets. Without a usable
+    manifest the log falls back to scanning segment tails backwards.
+
+    Sealed segments (all but the one being appended to) can be dropped,
+    rewritten or merged by maintenance code such as data/retention.py while
+    records are being appended; the log's lock is only held for the final
+    rename and bookkeeping. Records removed by a rewrite are tracked per segment,
+    so count stays exact.
+
+    A log directory has a single writer at a time. Opening a log only reads it, so
+    any number of processes can open the same directory to read, export or report
+    on it. The first call that modifies the log (append, a maintenance operation
+    or clear) takes an exclusive lock on the directory, reloading and repairing
+    the log's state from disk, and holds it until close(); a second log that
+    tries to modify the directory meanwhile (in this or another process) raises
+    RuntimeError. Code in one process that writes to the same directory should
+    share one log through get_segment_log(). A log that is not the writer picks up
+    records appended elsewhere on every read(), or explicitly through refresh().
+    """
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync='interval', fsync_interval=1.0):
+        """
+        Opens (or creates) the log in a directory.
+
+        :param directory: Directory holding the segment files.
+        :param segment_bytes: Size after which a new segment is started.
+        :param fsync: Durability policy: 'always', 'interval' or 'never'.
+        :param fsync_interval: Seconds between syncs under the 'interval' policy.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'; expected one of {FSYNC_POLICIES}.")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.lock = threading.RLock()
+        self._lock_file = None
+        self._file = None
+        self.refresh()
+
+    @property
+    def is_writer(self):
+        """True while this log holds the directory's writer lock."""
+        return self._lock_file is not None
+
+    def _load(self):
+        """
+        Loads the log's state from disk. Only the writer truncates damaged tails and
+        rewrites the manifest; a reader leaves the files as they are, since a tail
+        that looks torn may be a record the writer is appending right now.
+        """
+        directory = self.directory
+        self.segments = sorted(
+            int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for filename in os.listdir(directory)
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX)
+        )
+        self.next_seq = 0
+        # first_seq -> records removed from that segment by rewrites (e.g. downsampling)
+        self.dropped = {}
+        # Segment and byte offset of the newest record, None while the log is empty
+        self.latest_segment = None
+        self.latest_offset = None
+        self._size = 0
+        self._last_sync = self._last_manifest = time.monotonic()
+        if self.segments:
+            manifest = self._read_manifest()
+            if manifest is not None:
+                self.dropped = {int(first_seq): removed for first_seq, removed in manifest.get('dropped', {}).items()
+                                if int(first_seq) in self.segments}
+            if not self._replay_tail(manifest):
+                self._recover()
+            self._check_sealed_counts(manifest)
+            if self.is_writer:
+                self._write_manifest()
+
+    def refresh(self):
+        """Reloads the state of a log that is not the writer, picking up records appended elsewhere."""
+        with self.lock:
+            if self.is_writer:
+                return
+            for attempt in range(3):
+                try:
+                    return self._load()
+                except FileNotFoundError:
+                    # The writer dropped or merged a segment while it was being scanned
+                    if attempt == 2:
+                        raise
+
+    def _sealed_sizes(self):
+        return {first_seq: os.path.getsize(self.segment_path(first_seq)) for first_seq in self.segments[:-1]}
+
+    def _check_sealed_counts(self, manifest):
+        """
+        Recounts the records of sealed segments whose size differs from the one in
+        the manifest (or that the manifest does not know), so drop counts of
+        rewritten segments survive a missing or stale manifest.
+        """
+        known = (manifest or {}).get('sealed_sizes', {})
+        for index, (first_seq, size) in enumerate(self._sealed_sizes().items()):
+            if known.get(str(first_seq)) == size:
+                continue
+            with open(self.segment_path(first_seq), 'rb') as segment_file:
+                records = sum(chunk.count(b'\n') for chunk in iter(lambda: segment_file.read(1 << 20), b''))
+            removed = self.segments[index + 1] - first_seq - records
+            if removed > 0:
+                self.dropped[first_seq] = removed
+            else:
+                self.dropped.pop(first_seq, None)
+
+    def _acquire_writer_lock(self):
+        lock_file = open(os.path.join(self.directory, LOCK_NAME), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(f"Segment log {self.directory} is already open for writing elsewhere; "
+                                   f"share one log per directory through get_segment_log().")
+        self._lock_file = lock_file
+
+    def _ensure_writer(self):
+        """Takes the writer lock before the log is first modified, then reloads its state from disk."""
+        if self._lock_file is None:
+            self._acquire_writer_lock()
+            self._load()
+
+    def _release_writer_lock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @property
+    def count(self):
+        """Number of records in the log."""
+        if not self.segments:
+            return 0
+        return self.next_seq - self.segments[0] - sum(self.dropped.values())
+
+    def segment_path(self, first_seq):
+        """Returns the path of the segment whose first record has the given sequence number."""
+        return os.path.join(self.directory, _segment_name(first_seq))
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self):
+        manifest = {
+            'next_seq': self.next_seq,
+            'count': self.count,
+            'latest_segment': self.latest_segment,
+            'latest_offset': self.latest_offset,
+            'dropped': self.dropped,
+            'sealed_sizes': self._sealed_sizes(),
+        }
+        temp_path = f'{self.manifest_path}.tmp'
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+            if self.fsync != 'never':
+                manifest_file.flush()
+                os.fsync(manifest_file.fileno())
+        os.replace(temp_path, self.manifest_path)
+        self._last_manifest = time.monotonic()
+
+    def _replay_tail(self, manifest):
+        """
+        Checks the records appended after the manifest was written and truncates a
+        damaged tail. Returns False if the manifest does not match the segments.
+        """
+        if manifest is None or manifest['latest_segment'] not in self.segments:
+            return False
+        tail_segment = self.segments[-1]
+        resume = manifest['latest_segment'] == tail_segment
+        if resume:
+            # Start from the newest record the manifest knows, which must still be intact
+            offset, expected = manifest['latest_offset'], manifest['next_seq'] - 1
+        elif manifest['next_seq'] == tail_segment:
+            offset, expected = 0, tail_segment
+        else:
+            return False
+
+        path = self.segment_path(tail_segment)
+        latest_offset = None
+        with open(path, 'r+b' if self.is_writer else 'rb') as log_file:
+            size = log_file.seek(0, os.SEEK_END)
+            if offset > size:
+                return False
+            log_file.seek(offset)
+            end = offset
+            for line in log_file:
+                record = _parse_record(line) if line.endswith(b'\n') else None
+                if record is None or record['seq'] != expected:
+                    break
+                latest_offset = end
+                end += len(line)
+                expected += 1
+            if resume and latest_offset is None:
+                return False
+            self._truncate(log_file, path, end, size)
+
+        self.next_seq = expected
+        if latest_offset is not None:
+            self.latest_segment, self.latest_offset = tail_segment, latest_offset
+        else:
+            self.latest_segment, self.latest_offset = manifest['latest_segment'], manifest['latest_offset']
+        return True
+
+    def _truncate(self, log_file, path, end, size):
+        if end < size and self.is_writer:
+            logger.warning(f"Truncated {size - end} damaged bytes from the tail of {path}")
+            log_file.truncate(end)
+            os.fsync(log_file.fileno())
+
+    def _recover(self):
+        """Finds the newest intact record by scanning segment tails backwards, truncating damaged tails."""
+        self.next_seq = self.segments[-1]
+        for first_seq in reversed(self.segments):
+            offset, last_seq = self._recover_segment(first_seq)
+            if last_seq is not None:
+                if first_seq == self.segments[-1]:
+                    self.next_seq = last_seq + 1
+                self.latest_segment, self.latest_offset = first_seq, offset
+                return
+
+    def _recover_segment(self, first_seq):
+        """Truncates a damaged tail of a segment; returns (offset, seq) of its last record or (None, None)."""
+        path = self.segment_path(first_seq)
+        last_seq = None
+        with open(path, 'r+b' if self.is_writer else 'rb') as log_file:
+            size = end = log_file.seek(0, os.SEEK_END)
+            while end > 0:
+                log_file.seek(end - 1)
+                complete = log_file.read(1) == b'\n'
+                content_end = end - 1 if complete else end
+                start = _line_start(log_file, content_end)
+                if complete:
+                    log_file.seek(start)
+                    record = _parse_record(log_file.read(content_end - start))
+                    if record is not None:
+                        last_seq = record['seq']
+                        break
+                end = start
+            self._truncate(log_file, path, end, size)
+        return (start, last_seq) if last_seq is not None else (None, None)
+
+    def _open_segment(self):
+        """Opens the newest segment for appending, starting a new one if it is full."""
+        if self._file is not None:
+            self._close_segment()
+        if not self.segments or os.path.getsize(self.segment_path(self.segments[-1])) >= self.segment_bytes:
+            self.segments.append(self.next_seq)
+            new_segment = True
+        else:
+            new_segment = False
+        self._file = open(self.segment_path(self.segments[-1]), 'ab')
+        self._size = self._file.tell()
+        if new_segment:
+            if self.fsync != 'never':
+                self._sync_directory()
+            self._write_manifest()
+
+    def _close_segment(self):
+        self._file.flush()
+        if self.fsync != 'never':
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def _sync_directory(self):
+        # Makes a new segment's directory entry durable; not possible on every platform
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        directory_fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+    def append(self, data, saved_at=None):
+        """
+        Appends one record.
+
+        :param data: JSON-serializable record payload.
+        :param saved_at: POSIX timestamp stored as the record's time (default: now).
+        :return: The record's sequence number.
+        """
+        with self.lock:
+            return self._append(data, saved_at)
+
+    def _append(self, data, saved_at=None):
+        self._ensure_writer()
+        if self._file is None or self._size >= self.segment_bytes:
+            self._open_segment()
+        seq = self.next_seq
+        line = json.dumps({'seq': seq, 'time': time.time() if saved_at is None else saved_at, 'data': data}, separators=(',', ':')).encode() + b'\n'
+        self._file.write(line)
+        self._file.flush()
+        self.latest_segment, self.latest_offset = self.segments[-1], self._size
+        self._size += len(line)
+        self.next_seq = seq + 1
+
+        if self.fsync == 'always':
+            os.fsync(self._file.fileno())
+        now = time.monotonic()
+        if self.fsync == 'interval' and now - self._last_sync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+        if now - self._last_manifest >= self.fsync_interval:
+            self._write_manifest()
+        return seq
+
+    def sync(self):
+        """Forces every record appended so far to disk, whatever the fsync policy."""
+        with self.lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._last_sync = time.monotonic()
+
+    def last(self):
+        """Returns the newest record in O(1), or None if the log is empty."""
+        if self.latest_offset is None:
+            return None
+        with open(self.segment_path(self.latest_segment), 'rb') as log_file:
+            log_file.seek(self.latest_offset)
+            return _parse_record(log_file.readline())
+
+    def read(self, start_seq=None, end_seq=None):
+        """
+        Yields records in sequence order, one line at a time, optionally limited to
+        start_seq <= seq <= end_seq. Segments entirely outside the range are not
+        opened. Records appended after the call are not included, and records
+        in segments that are compacted during the scan may be skipped.
+        """
+        self.refresh()
+        with self.lock:
+            last_seq = self.next_seq - 1
+            segments = list(self.segments)
+        if end_seq is None or end_seq > last_seq:
+            end_seq = last_seq
+        previous_seq = -1
+        for index, first_seq in enumerate(segments):
+            if first_seq > end_seq:
+                return
+            if start_seq is not None and index + 1 < len(segments) and segments[index + 1] <= start_seq:
+                continue
+            try:
+                log_file = open(self.segment_path(first_seq), 'rb')
+            except FileNotFoundError:
+                # Dropped or merged into an earlier segment since the scan started
+                continue
+            with log_file:
+                for line in log_file:
+                    record = _parse_record(line)
+                    # A merge interrupted by a crash can leave a record in two segments
+                    if record is None or record['seq'] <= previous_seq:
+                        continue
+                    seq = previous_seq = record['seq']
+                    if seq > end_seq:
+                        return
+                    if start_seq is None or seq >= start_seq:
+                        yield record
+
+    def __iter__(self):
+        """Yields every record in sequence order."""
+        return self.read()
+
+    def sealed_segments(self):
+        """
+        Returns (first_seq, records, size in bytes, modification time) for every
+        segment that is no longer written to, oldest first.
+        """
+        with self.lock:
+            segments = list(self.segments)
+            bounds = segments[1:] + [self.next_seq]
+            sealed = [(first_seq, end_seq - first_seq - self.dropped.get(first_seq, 0))
+                      for first_seq, end_seq in zip(segments[:-1], bounds)
+                      if first_seq != self.latest_segment]
+        info = []
+        for first_seq, records in sealed:
+            try:
+                stat = os.stat(self.segment_path(first_seq))
+            except FileNotFoundError:
+                continue
+            info.append((first_seq, records, stat.st_size, stat.st_mtime))
+        return info
+
+    def _is_sealed(self, first_seq):
+        return first_seq in self.segments[:-1] and first_seq != self.latest_segment
+
+    def drop_oldest_segment(self):
+        """
+        Deletes the oldest segment if it is sealed.
+
+        :return: Number of records deleted, or None if there was nothing to drop.
+        """
+        with self.lock:
+            self._ensure_writer()
+            if not self.segments or not self._is_sealed(self.segments[0]):
+                return None
+            first_seq = self.segments.pop(0)
+            records = self.segments[0] - first_seq - self.dropped.pop(first_seq, 0)
+            os.remove(self.segment_path(first_seq))
+            self._write_manifest()
+        return records
+
+    def _write_temp(self, temp_path, lines):
+        with open(temp_path, 'wb') as temp_file:
+            for line in lines:
+                temp_file.write(line)
+            temp_file.flush()
+            if self.fsync != 'never':
+                os.fsync(temp_file.fileno())
+
+    def rewrite_segment(self, first_seq, keep):
+        """
+        Rewrites a sealed segment with only the records for which keep(record) is
+        true. The new file is written aside and renamed into place.
+
+        :return: Number of records removed, or None if the segment is not sealed.
+        """
+        with self.lock:
+            self._ensure_writer()
+            if not self._is_sealed(first_seq):
+                return None
+        path = self.segment_path(first_seq)
+        temp_path = f'{path}.tmp'
+        removed = 0
+
+        def kept_lines(segment_file):
+            nonlocal removed
+            for line in segment_file:
+                record = _parse_record(line)
+                if record is not None and keep(record):
+                    yield line
+                else:
+                    removed += 1
+
+        with open(path, 'rb') as segment_file:
+            self._write_temp(temp_path, kept_lines(segment_file))
+        with self.lock:
+            if not self._is_sealed(first_seq):
+                os.remove(temp_path)
+                return None
+            os.replace(temp_path, path)
+            self.dropped[first_seq] = self.dropped.get(first_seq, 0) + removed
+            self._write_manifest()
+        return removed
+
+    def merge_segments(self, first_seqs):
+        """
+        Concatenates consecutive sealed segments into the first of them.
+
+        :return: True if the segments were merged.
+        """
+        first_seqs = list(first_seqs)
+        with self.lock:
+            self._ensure_writer()
+            if len(first_seqs) < 2 or not all(self._is_sealed(first_seq) for first_seq in first_seqs):
+                return False
+            start = self.segments.index(first_seqs[0])
+            if self.segments[start:start + len(first_seqs)] != first_seqs:
+                return False
+        target = self.segment_path(first_seqs[0])
+        temp_path = f'{target}.tmp'
+
+        def merged_lines():
+            for first_seq in first_seqs:
+                with open(self.segment_path(first_seq), 'rb') as segment_file:
+                    yield from segment_file
+
+        self._write_temp(temp_path, merged_lines())
+        with self.lock:
+            if not all(self._is_sealed(first_seq) for first_seq in first_seqs):
+                os.remove(temp_path)
+                return False
+            os.replace(temp_path, target)
+            if any(first_seq in self.dropped for first_seq in first_seqs):
+                self.dropped[first_seqs[0]] = sum(self.dropped.pop(first_seq, 0) for first_seq in first_seqs)
+            for first_seq in first_seqs[1:]:
+                self.segments.remove(first_seq)
+                os.remove(self.segment_path(first_seq))
+            self._write_manifest()
+        return True
+
+    def close(self):
+        """
+        Flushes and closes the active segment, brings the manifest up to date and
+        releases the directory for other writers.
+        """
+        with self.lock:
+            if self._file is not None:
+                self._close_segment()
+                self._write_manifest()
+            self._release_writer_lock()
+
+    def clear(self):
+        """Deletes every segment; the sequence numbers start again from 0."""
+        with self.lock:
+            self._ensure_writer()
+            if self._file is not None:
+                self._close_segment()
+            for first_seq in self.segments:
+                os.remove(self.segment_path(first_seq))
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+            self.segments = []
+            self.dropped = {}
+            self.next_seq = 0
+            self.latest_segment = self.latest_offset = None
@@ -1,8 +1,33 @@
 import json
 import os
+import time
 from datetime import datetime
-from utilities import save_json, load_json, ensure_directory_exists
+from itertools import islice
+from utilities import load_json, ensure_directory_exists, append_log_entry
 from config import Config
+from segment_log import get_segment_log
+from columnar_export import export_training_history
+from training_stats import TrainingStats
+from io_executor import get_io_executor
+
+def legacy_step_time(filename):
+    """Return the save time encoded in a step_<timestamp>.json filename, or None."""
+    try:
+        return datetime.strptime(filename[len('step_'):-len('.json')], '%Y%m%d%H%M%S%f').timestamp()
+    except ValueError:
+        return None
+
+# Running statistics shared by every TrainingData of an agent in this process, by file path
+_shared_stats = {}
+
+def _batched(items, batch_size):
+    """Yield lists of up to batch_size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
 
 class TrainingData:
     def __init__(self, agent_id):
@@ -10,50 +35,179 @@ class TrainingData:
         self.agent_id = agent_id
         self.data_dir = os.path.join(Config.AGENT_DATA_DIR, agent_id, 'training')
         ensure_directory_exists(self.data_dir)
+        # Steps are appended to a segmented log instead of one JSON file per step;
+        # every TrainingData for the agent in this process shares the same log
+        self.step_log = get_segment_log(
+            os.path.join(self.data_dir, 'steps'),
+            segment_bytes=Config.TRAINING_SEGMENT_BYTES,
+            fsync=Config.TRAINING_FSYNC_POLICY,
+            fsync_interval=Config.TRAINING_FSYNC_INTERVAL,
+        )
+        # Steps saved one file each by older versions are listed once, oldest first
+        self.legacy_files = sorted(f for f in os.listdir(self.data_dir) if f.endswith('.json'))
+        stats_path = os.path.join(self.step_log.directory, 'stats.json')
+        with self.step_log.lock:
+            self.stats = _shared_stats.get(stats_path)
+            if self.stats is None:
+                self.stats = _shared_stats[stats_path] = TrainingStats(stats_path)
+                self._load_stats()
+
+    def _load_stats(self):
+        """Load the running statistics and fold in steps appended since they were saved."""
+        stats = self.stats
+        with self.step_log.lock:
+            if not stats.load() or stats.last_seq >= self.step_log.next_seq:
+                # No usable stats (first run, changed settings or a lost log tail): rebuild once
+                stats.reset()
+                for seq, saved_at, step in self.iter_training_steps(with_metadata=True):
+                    stats.add(step, saved_at, seq)
+            else:
+                self._catch_up_stats(self.step_log.next_seq)
+            stats.save(force=True)
+
+    def _catch_up_stats(self, end_seq):
+        """Fold steps appended by another writer (before end_seq) into the running statistics."""
+        stats = self.stats
+        for record in self.step_log.read(start_seq=stats.last_seq + 1, end_seq=end_seq - 1):
+            stats.add(record['data'], record['time'], record['seq'])
+        stats.last_seq = max(stats.last_seq, end_seq - 1)
 
     def save_training_step(self, step_data):
-        """Save a single training step's data."""
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-        step_file = os.path.join(self.data_dir, f'step_{timestamp}.json')
-        save_json(step_data, step_file)
+        """Save a single training step's data and update the running statistics."""
+        saved_at = time.time()
+        with self.step_log.lock:
+            seq = self.step_log.append(step_data, saved_at)
+            if seq <= self.stats.last_seq:
+                # The log was cleared or truncated behind our back
+                self._load_stats()
+            else:
+                if seq > self.stats.last_seq + 1:
+                    self._catch_up_stats(seq)
+                self.stats.add(step_data, saved_at, seq)
+                self.stats.save()
+
+    def save_training_step_async(self, step_data):
+        """
+        Queue save_training_step on the background I/O executor and return a Future.
+        Queued steps are appended in the order they were submitted.
+        """
+        return get_io_executor().submit(self.save_training_step, step_data, key=self.step_log.directory)
 
     def load_training_steps(self):
-        """Load all training steps for the agent."""
-        training_steps = []
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.json'):
-                step_data = load_json(os.path.join(self.data_dir, filename))
-                training_steps.append(step_data)
-        return training_steps
+        """Load all training steps for the agent, oldest first."""
+        return list(self.iter_training_steps())
+
+    def iter_training_steps(self, start_seq=None, end_seq=None, start_time=None, end_time=None,
+                            fields=None, batch_size=None, with_metadata=False):
+        """
+        Stream training steps in sequence order without loading them all into memory.
+
+        :param start_seq: Skip steps with a lower sequence number (inclusive bound).
+        :param end_seq: Stop after this sequence number (inclusive bound).
+        :param start_time: Skip steps saved before this POSIX timestamp.
+        :param end_time: Skip steps saved after this POSIX timestamp.
+        :param fields: Only keep these keys of each (dict) step.
+        :param batch_size: Yield lists of up to batch_size steps instead of single steps.
+        :param with_metadata: Yield (seq, time, step) tuples instead of steps. Steps
+                              from older step_*.json files come first, with seq None.
+        :return: A generator.
+        """
+        steps = self._iter_steps(start_seq, end_seq, start_time, end_time, fields, with_metadata)
+        if batch_size is None:
+            return steps
+        return _batched(steps, batch_size)
+
+    def iter_legacy_steps(self, skip=()):
+        """Stream steps saved one file each by older versions as (filename, time, step), oldest first."""
+        for filename in self.legacy_files:
+            if filename not in skip:
+                yield filename, legacy_step_time(filename), load_json(os.path.join(self.data_dir, filename))
+
+    def _iter_steps(self, start_seq, end_seq, start_time, end_time, fields, with_metadata):
+        def in_time_range(saved_at):
+            if start_time is None and end_time is None:
+                return True
+            if saved_at is None:
+                return False
+            return (start_time is None or saved_at >= start_time) and (end_time is None or saved_at <= end_time)
+
+        def project(step):
+            if fields is None or not isinstance(step, dict):
+                return step
+            return {field: step[field] for field in fields if field in step}
+
+        # Legacy step files have no sequence number and precede the step log
+        if start_seq is None:
+            for filename in self.legacy_files:
+                saved_at = legacy_step_time(filename)
+                if in_time_range(saved_at):
+                    step = project(load_json(os.path.join(self.data_dir, filename)))
+                    yield (None, saved_at, step) if with_metadata else step
+
+        for record in self.step_log.read(start_seq, end_seq):
+            if in_time_range(record['time']):
+                step = project(record['data'])
+                yield (record['seq'], record['time'], step) if with_metadata else step
 
     def get_latest_training_step(self):
-        """Retrieve the most recent training step."""
-        files = [f for f in os.listdir(self.data_dir) if f.endswith('.json')]
-        if not files:
-            return None
-        latest_file = max(files, key=lambda f: os.path.getmtime(os.path.join(self.data_dir, f)))
-        return load_json(os.path.join(self.data_dir, latest_file))
+        """Retrieve the most recent training step in O(1) via the step log's manifest."""
+        record = self.step_log.last()
+        if record is not None:
+            return record['data']
+        if self.legacy_files:
+            return load_json(os.path.join(self.data_dir, self.legacy_files[-1]))
+        return None
+
+    def get_training_step_count(self):
+        """Return the number of saved training steps without loading them."""
+        return len(self.legacy_files) + self.step_log.count
+
+    def export_columns(self, output_dir, chunk_size=100000, file_format='npz'):
+        """Export the training history to a columnar layout for analytics (see export_training_history)."""
+        return export_training_history(self, output_dir, chunk_size=chunk_size, file_format=file_format)
+
+    def get_training_statistics(self):
+        """Return running statistics (count, mean/variance/min/max per tracked field) in O(1)."""
+        with self.step_log.lock:
+            return self.stats.summary()
+
+    def get_training_histogram(self, field='reward'):
+        """Return per-time-bucket statistics of a tracked field as [(bucket start, stats)]."""
+        with self.step_log.lock:
+            return self.stats.histogram(field)
+
+    def close(self):
+        """Save the running statistics, then flush and close the training step log."""
+        with self.step_log.lock:
+            self.stats.save(force=True)
+        self.step_log.close()
 
     def clear_training_data(self):
         """Clear all training data."""
+        with self.step_log.lock:
+            self.step_log.clear()
+            self.stats.reset()
+            if os.path.exists(self.stats.path):
+                os.remove(self.stats.path)
         for filename in os.listdir(self.data_dir):
             file_path = os.path.join(self.data_dir, filename)
             if os.path.isfile(file_path):
                 os.remove(file_path)
+        self.legacy_files = []
 
     def get_training_summary(self):
-        """Summarize training data for analytics."""
-        total_steps = len(self.load_training_steps())
+        """Summarize training data for analytics from running aggregates, without reading the history."""
+        total_steps = self.get_training_step_count()
         summary = {
             'agent_id': self.agent_id,
             'total_training_steps': total_steps,
             'last_training_step': self.get_latest_training_step(),
+            'statistics': self.get_training_statistics(),
         }
         return summary
 
     def log_training_progress(self):
-        """Log the training progress to a file."""
+        """Log the training progress to a file; cheap enough to call after every step."""
         summary = self.get_training_summary()
         log_file = os.path.join(Config.LOGS_DIR, f'training_progress_{self.agent_id}.log')
-        with open(log_file, 'a') as log:
-            log.write(f"{datetime.now()} - Training Progress: {json.dumps(summary, indent=4)}\n")
\ No newline at end of file
+        append_log_entry(log_file, f"{datetime.now()} - Training Progress: {json.dumps(summary, indent=4)}\n")
\ No newline at end of file
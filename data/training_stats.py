@@ -0,0 +1,172 @@
+import math
+import os
+import time
+from config import Config
+from utilities import load_json, write_json_atomic
+
+
+class RunningStats:
+    """Count, mean, variance (Welford's algorithm), min and max of a stream of numbers."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=None, max=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        """Population variance; 0 until two values have been added."""
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    def summary(self):
+        return {'count': self.count, 'mean': self.mean, 'variance': self.variance,
+                'std': math.sqrt(self.variance), 'min': self.min, 'max': self.max}
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def _numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class TrainingStats:
+    """
+    Running aggregates over the training steps of one agent, updated as each step
+    is saved so that summaries never have to read the step history.
+
+    For every tracked field (e.g. 'reward') it keeps a RunningStats over all steps
+    and, in time buckets of bucket_seconds, a RunningStats per bucket; the buckets
+    form a histogram of training activity and reward over time, of which the newest
+    max_buckets are kept. The aggregates cover every step saved, including steps
+    later removed by retention.
+
+    The stats are written to a file together with the sequence number of the last
+    step they include, at most every save_interval seconds and on close. On load,
+    steps appended after that point are replayed from the step log.
+    """
+
+    def __init__(self, path, fields=None, bucket_seconds=None, max_buckets=None, save_interval=None):
+        """
+        :param path: File the stats are persisted to.
+        :param fields: Numeric step fields to aggregate (default: Config.TRAINING_STATS_FIELDS).
+        :param bucket_seconds: Width of a histogram bucket (default: Config.TRAINING_STATS_BUCKET_SECONDS).
+        :param max_buckets: Buckets kept per field (default: Config.TRAINING_STATS_MAX_BUCKETS).
+        :param save_interval: Minimum seconds between saves (default: Config.TRAINING_FSYNC_INTERVAL).
+        """
+        self.path = path
+        self.fields = tuple(fields or Config.TRAINING_STATS_FIELDS)
+        self.bucket_seconds = bucket_seconds or Config.TRAINING_STATS_BUCKET_SECONDS
+        self.max_buckets = max_buckets or Config.TRAINING_STATS_MAX_BUCKETS
+        self.save_interval = Config.TRAINING_FSYNC_INTERVAL if save_interval is None else save_interval
+        self.reset()
+        self._last_save = time.monotonic()
+
+    def reset(self):
+        self.count = 0
+        self.first_time = None
+        self.last_time = None
+        self.last_seq = -1
+        self.totals = {field: RunningStats() for field in self.fields}
+        # field -> {bucket start: RunningStats}, in ascending time order
+        self.buckets = {field: {} for field in self.fields}
+        self.dirty = False
+
+    def add(self, step, saved_at, seq=None):
+        """Folds one saved step into the aggregates."""
+        self.count += 1
+        if saved_at is not None:
+            if self.first_time is None:
+                self.first_time = saved_at
+            self.last_time = saved_at
+        if seq is not None:
+            self.last_seq = seq
+        self.dirty = True
+        if not isinstance(step, dict):
+            return
+        for field in self.fields:
+            value = step.get(field)
+            if not _numeric(value):
+                continue
+            self.totals[field].add(value)
+            if saved_at is None:
+                continue
+            buckets = self.buckets[field]
+            start = int(saved_at // self.bucket_seconds * self.bucket_seconds)
+            bucket = buckets.get(start)
+            if bucket is None:
+                bucket = buckets[start] = RunningStats()
+                if len(buckets) > self.max_buckets:
+                    del buckets[next(iter(buckets))]
+            bucket.add(value)
+
+    def summary(self):
+        """Returns the aggregates in O(1), without the histogram."""
+        return {
+            'count': self.count,
+            'first_time': self.first_time,
+            'last_time': self.last_time,
+            'fields': {field: stats.summary() for field, stats in self.totals.items()},
+        }
+
+    def histogram(self, field):
+        """Returns [(bucket start, bucket summary)] for a tracked field, oldest first."""
+        return [(start, stats.summary()) for start, stats in self.buckets[field].items()]
+
+    def load(self):
+        """Loads persisted stats; returns False if there are none or they were kept for other settings."""
+        data = load_json(self.path)
+        if not data or data.get('fields') != list(self.fields) or data.get('bucket_seconds') != self.bucket_seconds:
+            self.reset()
+            return False
+        self.count = data['count']
+        self.first_time = data['first_time']
+        self.last_time = data['last_time']
+        self.last_seq = data['last_seq']
+        self.totals = {field: RunningStats.from_dict(data['totals'][field]) for field in self.fields}
+        self.buckets = {
+            field: {int(start): RunningStats.from_dict(stats) for start, stats in data['buckets'][field]}
+            for field in self.fields
+        }
+        self.dirty = False
+        return True
+
+    def save(self, force=False):
+        """Writes the stats if they changed, at most once per save_interval unless forced."""
+        if not self.dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_save < self.save_interval:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json_atomic({
+            'fields': list(self.fields),
+            'bucket_seconds': self.bucket_seconds,
+            'count': self.count,
+            'first_time': self.first_time,
+            'last_time': self.last_time,
+            'last_seq': self.last_seq,
+            'totals': {field: stats.to_dict() for field, stats in self.totals.items()},
+            'buckets': {field: [[start, stats.to_dict()] for start, stats in buckets.items()]
+                        for field, buckets in self.buckets.items()},
+        }, self.path)
+        self.dirty = False
+        self._last_save = now
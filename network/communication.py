@@ -1,27 +1,82 @@
 import json
 import logging
 import socket
+import struct
 import threading
 import time
 from queue import Queue
 
+try:
+    from config import Config
+except ImportError:  # Run from the network directory without the project root on the path
+    Config = None
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Framed messages start with FRAME_MAGIC and a 4-byte big-endian length, so they
+# can be of any size; unframed messages are still read with a single recv(1024)
+FRAME_MAGIC = b'ENF1'
+FRAME_HEADER = struct.Struct('>4sI')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
 class CommunicationError(Exception):
     """Custom exception for communication errors."""
     pass
 
+def _recv_exact(sock, size, data=b''):
+    """Reads until data holds size bytes, or returns None if the peer closes first."""
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 65536))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def send_frame(sock, payload):
+    """Sends bytes as one length-prefixed frame."""
+    if len(payload) > MAX_FRAME_BYTES:
+        raise CommunicationError(f"Message of {len(payload)} bytes exceeds the {MAX_FRAME_BYTES}-byte frame limit")
+    sock.sendall(FRAME_HEADER.pack(FRAME_MAGIC, len(payload)) + payload)
+
+def recv_frame(sock, data=b''):
+    """
+    Reads one length-prefixed frame.
+
+    :param data: Bytes of the frame that were already received.
+    :return: The payload, or None if the peer closed the connection.
+    """
+    header = _recv_exact(sock, FRAME_HEADER.size, data)
+    if header is None:
+        return None
+    magic, size = FRAME_HEADER.unpack(header[:FRAME_HEADER.size])
+    if magic != FRAME_MAGIC:
+        raise CommunicationError("Received data is not a framed message")
+    if size > MAX_FRAME_BYTES:
+        raise CommunicationError(f"Frame of {size} bytes exceeds the {MAX_FRAME_BYTES}-byte limit")
+    payload = _recv_exact(sock, FRAME_HEADER.size + size, header)
+    if payload is None:
+        raise CommunicationError("Connection closed in the middle of a frame")
+    return payload[FRAME_HEADER.size:]
+
 class EchoNetworkCommunication:
-    def __init__(self, host='localhost', port=5000, max_retries=3):
+    def __init__(self, host='localhost', port=5000, max_retries=3, framed=None):
         """
         Initializes the communication system.
 
         :param host: The host for the communication system (default: 'localhost').
         :param port: The port to listen for incoming messages (default: 5000).
         :param max_retries: The maximum number of retries for failed messages (default: 3).
+        :param framed: Send messages as length-prefixed frames (default:
+                       Config.NETWORK_FRAMED_MESSAGES). Servers from before framing
+                       read one recv(1024) and cannot parse frames; set this to
+                       False to talk to them, with messages and replies limited
+                       to 1024 bytes. The server side accepts both forms.
         """
+        if framed is None:
+            framed = Config.NETWORK_FRAMED_MESSAGES if Config is not None else True
+        self.framed = framed
         self.host = host
         self.port = port
         self.sock = None
@@ -30,6 +85,7 @@ class EchoNetworkCommunication:
         self.message_queue = Queue()
         self.agent_status = {}
         self.max_retries = max_retries
+        self.message_handlers = {}
 
     def start_server(self):
         """Starts the server to listen for incoming agent communications."""
@@ -61,6 +117,12 @@ class EchoNetworkCommunication:
                 message = client_sock.recv(1024)
                 if not message:
                     break
+                # Framed messages may be longer than one recv; unframed ones keep the old behaviour
+                framed = message[:len(FRAME_MAGIC)] == FRAME_MAGIC[:len(message)]
+                if framed:
+                    message = recv_frame(client_sock, message)
+                    if message is None:
+                        break
 
                 logger.info(f"Received message from {client_addr}: {message.decode()}")
                 self.messages.append(message.decode())
@@ -69,7 +131,11 @@ class EchoNetworkCommunication:
                 self.update_agent_status(client_addr, 'active')
 
                 # Respond to the client
-                client_sock.send(json.dumps({"status": "received", "message": message.decode()}).encode())
+                response = json.dumps(self.dispatch_message(message.decode())).encode()
+                if framed:
+                    send_frame(client_sock, response)
+                else:
+                    client_sock.send(response)
 
         except Exception as e:
             logger.error(f"Error communicating with client {client_addr}: {e}")
@@ -78,22 +144,55 @@ class EchoNetworkCommunication:
         finally:
             client_sock.close()
 
+    def register_handler(self, message_type, handler):
+        """
+        Registers a handler for JSON messages with a given 'type' field.
+
+        :param message_type: The value of the message's 'type' field.
+        :param handler: Callable taking the decoded message dict and returning the response dict.
+        """
+        self.message_handlers[message_type] = handler
+
+    def dispatch_message(self, message):
+        """
+        Builds the response to a received message. Typed JSON messages go to their
+        registered handler; anything else is acknowledged as before.
+
+        :param message: The decoded message string.
+        :return: The response dict.
+        """
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict) and payload.get('type') in self.message_handlers:
+            return self.message_handlers[payload['type']](payload)
+        return {"status": "received", "message": message}
+
     def send_message(self, host, port, message, retries=0):
         """
-        Sends a message to a specific agent (client).
+        Sends a message to a specific agent (client). With framing (the default)
+        the message is sent as a length-prefixed frame, so neither the message nor
+        the response is limited to one receive buffer.
 
         :param host: The host of the agent.
         :param port: The port where the agent is listening.
         :param message: The message to send.
         :param retries: The number of retries if the message fails to send.
         """
+        client_sock = None
         try:
             client_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             client_sock.connect((host, port))
             logger.info(f"Sending message to {host}:{port}")
-            client_sock.send(message.encode())
-
-            response = client_sock.recv(1024)
+            if self.framed:
+                send_frame(client_sock, message.encode())
+                response = recv_frame(client_sock)
+            else:
+                client_sock.send(message.encode())
+                response = client_sock.recv(1024)
+            if not response:
+                raise CommunicationError("Connection closed before a response was received")
             logger.info(f"Received response from {host}:{port}: {response.decode()}")
             return json.loads(response.decode())
 
@@ -107,7 +206,8 @@ class EchoNetworkCommunication:
                 logger.error(f"Failed to send message after {self.max_retries} retries.")
                 raise CommunicationError(f"Failed to send message: {e}")
         finally:
-            client_sock.close()
+            if client_sock is not None:
+                client_sock.close()
 
     def broadcast_message(self, agents, message):
         """
@@ -0,0 +1,286 @@
+import json
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Default bound on the encoded size of a delta message, envelope included
+MAX_MESSAGE_BYTES = 1000
+
+
+def _encode_state(state):
+    return list(state) if isinstance(state, tuple) else state
+
+
+def _decode_state(state):
+    return tuple(state) if isinstance(state, list) else state
+
+
+def _version_entry_size(origin, clock):
+    # '"origin": clock, ' as written by json.dumps
+    return len(json.dumps(origin)) + len(str(clock)) + 4
+
+
+class IncompleteSyncError(Exception):
+    """Raised when a pull or push runs out of rounds before the delta is complete."""
+
+    def __init__(self, message, accepted=0, peer_version=None):
+        super().__init__(message)
+        self.accepted = accepted
+        self.peer_version = peer_version
+
+
+class KnowledgeSync:
+    """
+    Exchanges sparse updates of learned values (e.g. Q-table rows) between agents.
+
+    Every row carries a (clock, origin) stamp from a Lamport clock, and each agent
+    keeps a version vector holding the highest clock it has integrated from every
+    origin. A peer asks for everything newer than its version vector and gets only
+    the rows written since then, so sync traffic scales with the volume of change,
+    not with the size of the table. Deltas are cut to a bounded message size; the
+    returned version vector only covers what was actually sent, so the peer simply
+    asks again until the delta is complete.
+
+    Rows received from peers are relayed to other peers under their original stamp.
+    Conflicting writes to the same row resolve to the higher stamp on every agent.
+    """
+
+    def __init__(self, agent_id, max_bytes=MAX_MESSAGE_BYTES, tolerance=1e-6):
+        """
+        Initializes the sync state.
+
+        :param agent_id: ID of the local agent; used as the origin of local writes.
+        :param max_bytes: Maximum encoded size of a delta message.
+        :param tolerance: Smallest change in a value that is worth publishing.
+        """
+        self.agent_id = agent_id
+        self.max_bytes = max_bytes
+        self.tolerance = tolerance
+        self.clock = 0
+        self.version = {agent_id: 0}
+        # state -> (values, clock, origin): the newest known row for every state
+        self.rows = {}
+        # origin -> OrderedDict of state -> clock, in ascending clock order
+        self.logs = {}
+        # state -> values currently held by the local learner, for change detection
+        self.baseline = {}
+
+    def _store(self, state, values, clock, origin):
+        previous = self.rows.get(state)
+        if previous is not None:
+            self.logs[previous[2]].pop(state, None)
+        self.rows[state] = (values, clock, origin)
+        self.logs.setdefault(origin, OrderedDict())[state] = clock
+
+    def publish(self, state, values):
+        """
+        Records a local change to a row. Rows that did not move by more than the
+        tolerance since they were last published or merged are ignored.
+
+        :return: True if the row was published.
+        """
+        values = [float(value) for value in values]
+        baseline = self.baseline.get(state)
+        if baseline is not None and all(abs(a - b) <= self.tolerance for a, b in zip(values, baseline)):
+            return False
+        row_size = len(json.dumps([_encode_state(state), values, self.clock + 1, self.agent_id])) + 2
+        if self._envelope_size() + _version_entry_size(self.agent_id, self.clock + 1) + row_size > self.max_bytes:
+            raise ValueError(f"Row for state {state!r} does not fit in a {self.max_bytes}-byte sync message.")
+        self.clock += 1
+        self._store(state, values, self.clock, self.agent_id)
+        self.version[self.agent_id] = self.clock
+        self.baseline[state] = values
+        return True
+
+    def publish_table(self, states, values):
+        """
+        Publishes every row of a table that changed since the last sync.
+
+        :param states: Row states, e.g. QTable.states.
+        :param values: Matching 2-D array or list of rows, e.g. QTable.table.
+        :return: Number of rows published.
+        """
+        rows = values.tolist() if hasattr(values, 'tolist') else values
+        return sum(self.publish(state, row) for state, row in zip(states, rows))
+
+    def _envelope_size(self):
+        """Encoded size of an empty, incomplete delta message from this agent."""
+        return len(json.dumps({'type': 'knowledge_delta', 'sender': self.agent_id, 'rows': [],
+                               'version': {}, 'complete': False}))
+
+    def build_delta(self, peer_version):
+        """
+        Builds a delta message with the rows the peer has not seen yet, oldest
+        first per origin. The whole encoded message, envelope and version vector
+        included, stays within max_bytes; version entries are only sent for
+        origins where the peer is behind.
+
+        :param peer_version: The peer's version vector (origin -> clock).
+        :return: A 'knowledge_delta' message dict.
+        :raises ValueError: If a single row cannot fit in a message of max_bytes.
+        """
+        message = {'type': 'knowledge_delta', 'sender': self.agent_id, 'rows': [], 'version': {}, 'complete': True}
+        envelope_size = size = self._envelope_size()
+
+        for origin, log in self.logs.items():
+            seen = peer_version.get(origin, 0)
+            latest = self.version.get(origin, 0)
+            pending = []
+            # Walk back from the newest row until reaching what the peer already has
+            for state in reversed(log):
+                clock = log[state]
+                if clock <= seen:
+                    break
+                pending.append((state, clock))
+                latest = max(latest, clock)
+            if not pending and latest <= seen:
+                continue
+
+            entry_size = _version_entry_size(origin, latest)
+            if size + entry_size > self.max_bytes:
+                if not message['rows'] and not message['version']:
+                    raise ValueError(f"max_bytes={self.max_bytes} is too small for a sync message.")
+                message['complete'] = False
+                break
+            size += entry_size
+
+            sent_clock = max(seen, latest)
+            for state, clock in reversed(pending):
+                row = [_encode_state(state), self.rows[state][0], clock, origin]
+                row_size = len(json.dumps(row)) + 2
+                if size + row_size > self.max_bytes:
+                    if envelope_size + entry_size + row_size > self.max_bytes:
+                        raise ValueError(f"Row for state {state!r} from {origin} does not fit in a "
+                                         f"{self.max_bytes}-byte sync message.")
+                    message['complete'] = False
+                    sent_clock = max(seen, clock - 1)
+                    break
+                message['rows'].append(row)
+                size += row_size
+            message['version'][origin] = sent_clock
+            if not message['complete']:
+                break
+        return message
+
+    def apply_delta(self, message, merge=None):
+        """
+        Integrates a delta message from a peer.
+
+        :param message: A 'knowledge_delta' message dict.
+        :param merge: Optional callable (state, values) -> merged values, called for
+                      every accepted row so the learner can fold it into its own
+                      table; whatever it returns becomes the new change baseline.
+        :return: Number of rows accepted.
+        """
+        accepted = 0
+        for encoded_state, values, clock, origin in message['rows']:
+            state = _decode_state(encoded_state)
+            self.clock = max(self.clock, clock)
+            current = self.rows.get(state)
+            if current is not None and (current[1], current[2]) >= (clock, origin):
+                continue
+            self._store(state, values, clock, origin)
+            merged = merge(state, values) if merge is not None else values
+            self.baseline[state] = [float(value) for value in merged]
+            accepted += 1
+
+        for origin, clock in message['version'].items():
+            if clock > self.version.get(origin, 0):
+                self.version[origin] = clock
+        return accepted
+
+    def request_message(self):
+        """Builds a 'knowledge_request' asking a peer for everything newer than our version."""
+        return {'type': 'knowledge_request', 'sender': self.agent_id, 'version': dict(self.version)}
+
+    def handle_message(self, message, merge=None):
+        """
+        Handles an incoming sync message and returns the reply: a delta for a
+        request, or an acknowledgement with our version vector for a pushed delta.
+        """
+        if message['type'] == 'knowledge_request':
+            return self.build_delta(message['version'])
+        if message['type'] == 'knowledge_delta':
+            accepted = self.apply_delta(message, merge)
+            return {'type': 'knowledge_ack', 'sender': self.agent_id, 'accepted': accepted,
+                    'version': dict(self.version)}
+        raise ValueError(f"Unknown knowledge sync message type: {message['type']}")
+
+    def register(self, communication, merge=None):
+        """Serves sync requests from peers on an EchoNetworkCommunication server."""
+        for message_type in ('knowledge_request', 'knowledge_delta'):
+            communication.register_handler(message_type, lambda message: self.handle_message(message, merge))
+
+    def pull(self, communication, host, port, merge=None, max_rounds=100):
+        """
+        Pulls all missing rows from a peer, one bounded delta per round trip.
+
+        :return: Number of rows accepted.
+        :raises IncompleteSyncError: If the peer still has rows after max_rounds. The
+                                     rows already accepted stay applied, so calling
+                                     pull again resumes where this one stopped.
+        """
+        accepted = 0
+        for _ in range(max_rounds):
+            reply = communication.send_message(host, port, json.dumps(self.request_message()))
+            if not isinstance(reply, dict) or reply.get('type') != 'knowledge_delta':
+                raise ValueError(f"Peer {host}:{port} did not answer with a knowledge delta: {reply!r}")
+            accepted += self.apply_delta(reply, merge)
+            if reply['complete']:
+                break
+        else:
+            message = (f"Agent {self.agent_id} pulled {accepted} rows from {host}:{port} "
+                       f"but the sync was still incomplete after {max_rounds} rounds")
+            logger.warning(message)
+            raise IncompleteSyncError(message, accepted=accepted)
+        logger.info(f"Agent {self.agent_id} pulled {accepted} rows from {host}:{port}")
+        return accepted
+
+    def push(self, communication, host, port, peer_version=None, max_rounds=100):
+        """
+        Pushes rows a peer is missing, starting from its last known version vector.
+
+        :return: The peer's version vector after the push.
+        :raises IncompleteSyncError: If rows were still left after max_rounds; the
+                                     error carries the peer's version vector so far.
+        """
+        peer_version = dict(peer_version or {})
+        for _ in range(max_rounds):
+            delta = self.build_delta(peer_version)
+            reply = communication.send_message(host, port, json.dumps(delta))
+            if not isinstance(reply, dict) or reply.get('type') != 'knowledge_ack':
+                raise ValueError(f"Peer {host}:{port} did not acknowledge the knowledge delta: {reply!r}")
+            peer_version = reply['version']
+            if delta['complete']:
+                break
+        else:
+            message = (f"Agent {self.agent_id} pushed to {host}:{port} "
+                       f"but the sync was still incomplete after {max_rounds} rounds")
+            logger.warning(message)
+            raise IncompleteSyncError(message, peer_version=peer_version)
+        return peer_version
+
+
+# Example usage: two learners converging without a network connection
+if __name__ == "__main__":
+    lovis = KnowledgeSync("lovis")
+    reiner = KnowledgeSync("reiner")
+
+    # Lovis learned a whole table; Reiner catches up in bounded messages
+    lovis.publish_table([(x, y) for x in range(10) for y in range(10)],
+                        [[0.0, 1.0, 0.5, 0.5]] * 100)
+    rounds = 0
+    while True:
+        rounds += 1
+        delta = lovis.build_delta(reiner.version)
+        reiner.apply_delta(delta)
+        if delta['complete']:
+            break
+
+    # Reiner improves a single row; only that row travels back
+    reiner.publish((3, 4), [0.0, 2.0, 0.0, 0.0])
+    delta = reiner.build_delta(lovis.version)
+    lovis.apply_delta(delta)
+    print(f"Synced {len(reiner.rows)} rows in {rounds} bounded messages; "
+          f"sent back {len(delta['rows'])} row, row (3, 4) on lovis: {lovis.rows[(3, 4)][0]}")
@@ -1,11 +1,45 @@
 import random
 import time
 import logging
+import numpy as np
+from q_table import QTable
+from vector_env import VectorGridEnvironment
 
 # Setup logging configuration
 logging.basicConfig(filename='agent_learning_log.txt', level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Episodes are cut off after this many steps unless told otherwise, so a run's
+# length no longer depends on a random walk eventually reaching the goal
+DEFAULT_MAX_STEPS_PER_EPISODE = 1000
+
+
+def training_report(episode_lengths, truncated, seconds, stop_reason):
+    # Summarize a training run: throughput and the distribution of episode lengths
+    lengths = np.asarray(episode_lengths, dtype=np.int64)
+    steps = int(lengths.sum())
+    report = {
+        'episodes': len(lengths),
+        'steps': steps,
+        'seconds': seconds,
+        'steps_per_second': steps / seconds if seconds > 0 else 0.0,
+        'truncated_episodes': truncated,
+        'stop_reason': stop_reason,
+        'episode_lengths': {},
+    }
+    if len(lengths):
+        p50, p90, p99 = np.percentile(lengths, [50, 90, 99]).tolist()
+        report['episode_lengths'] = {
+            'min': int(lengths.min()),
+            'mean': float(lengths.mean()),
+            'p50': p50,
+            'p90': p90,
+            'p99': p99,
+            'max': int(lengths.max()),
+        }
+    return report
+
+
 class Agent:
     def __init__(self, id, learning_rate=0.1, discount_factor=0.9, exploration_rate=1.0, exploration_decay=0.995):
         self.id = id
@@ -14,8 +48,8 @@ class Agent:
         self.exploration_rate = exploration_rate  # Exploration-exploitation tradeoff
         self.exploration_decay = exploration_decay  # Decay of exploration over time
         
-        self.q_table = {}  # Q-Table to store learned values
         self.actions = ["move_left", "move_right", "move_up", "move_down"]  # Example set of actions
+        self.q_table = QTable(self.actions)  # Array-backed Q-Table to store learned values
         
     def get_state(self):
         # Simulating agent's state as a tuple of (x, y) coordinates, which may change over time
@@ -30,25 +64,29 @@ class Agent:
         return action
     
     def get_best_action(self, state):
-        # If state is not in Q-table, initialize it
-        if state not in self.q_table:
-            self.q_table[state] = {action: 0.0 for action in self.actions}
-        
-        # Return the action with the highest Q-value for the current state
-        best_action = max(self.q_table[state], key=self.q_table[state].get)
-        return best_action
+        # Cached per-state argmax; unseen states get a zero-initialised row and ties go to the first action
+        q_table = self.q_table
+        return self.actions[q_table.best_ids.item(q_table.state_id(state))]
     
     def update_q_table(self, state, action, reward, next_state):
-        # Initialize state-action pair in Q-table if not present
-        if state not in self.q_table:
-            self.q_table[state] = {action: 0.0 for action in self.actions}
-        if next_state not in self.q_table:
-            self.q_table[next_state] = {action: 0.0 for action in self.actions}
-
-        # Q-learning update rule
-        best_future_q = max(self.q_table[next_state].values())  # Best future Q-value
-        self.q_table[state][action] += self.learning_rate * (reward + self.discount_factor * best_future_q - self.q_table[state][action])
+        # Map both states to row IDs, initializing rows that are not present, and apply the Q-learning rule
+        q_table = self.q_table
+        q_table.q_learning_update(q_table.state_id(state), q_table.action_index[action], reward,
+                                  q_table.state_id(next_state), self.learning_rate, self.discount_factor)
     
+    def update_q_table_batch(self, state_ids, action_ids, rewards, next_state_ids, weights=None):
+        # Batched Q-learning update over arrays of Q-table row IDs; see QTable.q_learning_update_batch
+        return self.q_table.q_learning_update_batch(state_ids, action_ids, rewards, next_state_ids,
+                                                    self.learning_rate, self.discount_factor, weights)
+
+    def replay(self, replay_buffer, batch_size=32):
+        # Learn from a minibatch of stored transitions (states are Q-table row IDs)
+        if len(replay_buffer) == 0:
+            return
+        state_ids, action_ids, rewards, next_state_ids, _, indices, weights = replay_buffer.sample(batch_size)
+        td_errors = self.update_q_table_batch(state_ids, action_ids, rewards, next_state_ids, weights)
+        replay_buffer.update_priorities(indices, td_errors)
+
     def simulate_environment(self, state, action):
         # Simulate environment response based on the chosen action
         # This is a dummy environment with rewards and penalties
@@ -70,34 +108,135 @@ class Agent:
 
         return next_state, reward
     
-    def learn_from_experience(self, episodes=100):
-        # Simulate the agent learning over a number of episodes
+    def learn_from_experience(self, episodes=100, replay_buffer=None, replay_batch_size=32,
+                              max_steps_per_episode=DEFAULT_MAX_STEPS_PER_EPISODE, time_budget=None,
+                              convergence_threshold=None, convergence_patience=10):
+        # Simulate the agent learning over a number of episodes. With a replay buffer,
+        # every transition is also stored and a minibatch is replayed after each episode.
+        # Episodes are cut off after max_steps_per_episode steps (None for unbounded),
+        # the run stops once time_budget seconds have passed, and with a
+        # convergence_threshold it stops early after convergence_patience consecutive
+        # episodes in which no Q-value moved by more than the threshold.
+        # Returns a training report (see training_report).
+        q_table = self.q_table
+        action_index = q_table.action_index
+        step_limit = max_steps_per_episode or float('inf')
+        episode_lengths = []
+        truncated = 0
+        calm_episodes = 0
+        stop_reason = 'completed'
+        start_time = time.perf_counter()
+
         for episode in range(episodes):
             state = self.get_state()  # Start at a random state
+            state_id = q_table.state_id(state)
             done = False
             total_reward = 0
+            steps = 0
+            max_q_delta = 0.0
 
             while not done:
-                action = self.choose_action(state)  # Choose an action based on the state
+                action = self.choose_action(state)  # Choose an action based on the current state
                 next_state, reward = self.simulate_environment(state, action)  # Simulate the environment's response
                 
                 # Update the Q-table with the experience
-                self.update_q_table(state, action, reward, next_state)
+                next_state_id = q_table.state_id(next_state)
+                action_id = action_index[action]
+                q_delta = q_table.q_learning_update(state_id, action_id, reward, next_state_id,
+                                                   self.learning_rate, self.discount_factor)
+                if q_delta > max_q_delta or -q_delta > max_q_delta:
+                    max_q_delta = abs(q_delta)
                 
                 # Update state and total reward
-                state = next_state
+                previous_state_id = state_id
+                state, state_id = next_state, next_state_id
                 total_reward += reward
+                steps += 1
                 
                 # Simulate episode ending condition (e.g., reaching a certain state)
                 if state[0] >= 10 or state[1] >= 10:
                     done = True
 
+                if replay_buffer is not None:
+                    replay_buffer.add(previous_state_id, action_id, reward, next_state_id, done)
+
+                # Cut off episodes that wander away from the goal
+                if not done and steps >= step_limit:
+                    truncated += 1
+                    break
+
+            episode_lengths.append(steps)
+            if replay_buffer is not None:
+                self.replay(replay_buffer, replay_batch_size)
+
             # Decay exploration rate after each episode
             self.exploration_rate *= self.exploration_decay
             
             # Log learning progress
             logging.info(f"Episode {episode+1}/{episodes} - Total Reward: {total_reward} - Exploration Rate: {self.exploration_rate:.4f}")
+
+            if convergence_threshold is not None:
+                calm_episodes = calm_episodes + 1 if max_q_delta < convergence_threshold else 0
+                if calm_episodes >= convergence_patience:
+                    stop_reason = 'converged'
+                    break
+            if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+                stop_reason = 'time_budget'
+                break
+
+        return training_report(episode_lengths, truncated, time.perf_counter() - start_time, stop_reason)
         
+    def learn_from_batch(self, episodes=100, num_envs=64, seed=None, replay_buffer=None, replay_batch_size=32,
+                         max_steps_per_episode=DEFAULT_MAX_STEPS_PER_EPISODE, time_budget=None):
+        # Train on many parallel episodes per Python-level iteration using a
+        # vectorized environment and the batched Q-update. With a replay buffer,
+        # each batch of transitions is stored and a minibatch is replayed per iteration.
+        # Episode and time limits work as in learn_from_experience; returns a training report.
+        if self.actions != VectorGridEnvironment.ACTIONS:
+            raise ValueError("Batched learning requires the default grid-world actions.")
+
+        q_table = self.q_table
+        env = VectorGridEnvironment(num_envs, seed=seed, max_steps=max_steps_per_episode)
+        rng = np.random.default_rng(seed)
+        state_ids = q_table.state_id_batch(env.state_tuples(env.reset()))
+        completed = 0
+        episode_lengths = []
+        truncated = 0
+        stop_reason = 'completed'
+        start_time = time.perf_counter()
+
+        while completed < episodes:
+            # Epsilon-greedy over the whole batch
+            action_ids = q_table.best_actions(state_ids)
+            explore = rng.random(num_envs) < self.exploration_rate
+            action_ids[explore] = rng.integers(0, len(self.actions), size=int(explore.sum()))
+
+            next_states, rewards, dones, info = env.step(action_ids)
+            next_state_ids = q_table.state_id_batch(env.state_tuples(next_states))
+            self.update_q_table_batch(state_ids, action_ids, rewards, next_state_ids)
+            if replay_buffer is not None:
+                replay_buffer.add_batch(state_ids, action_ids, rewards, next_state_ids, dones)
+                self.replay(replay_buffer, replay_batch_size)
+
+            # Finished slots continue from their freshly reset start state
+            state_ids = next_state_ids
+            finished = np.flatnonzero(dones)
+            if finished.size:
+                state_ids[finished] = q_table.state_id_batch(env.state_tuples(env.states[finished]))
+                episode_lengths.extend(info['episode_lengths'].tolist())
+                truncated += int(info['truncated'].sum())
+                for total_reward in info['episode_returns'].tolist():
+                    completed += 1
+                    # Decay exploration rate after each episode
+                    self.exploration_rate *= self.exploration_decay
+                    logging.info(f"Episode {completed}/{episodes} - Total Reward: {total_reward} - Exploration Rate: {self.exploration_rate:.4f}")
+
+            if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+                stop_reason = 'time_budget'
+                break
+
+        return training_report(episode_lengths, truncated, time.perf_counter() - start_time, stop_reason)
+
     def print_q_table(self):
         # Print the Q-table for debugging purposes
         for state, actions in self.q_table.items():
@@ -108,7 +247,9 @@ def main():
     agent = Agent(id=1)
     
     # Start learning process
-    agent.learn_from_experience(episodes=100)
+    report = agent.learn_from_experience(episodes=100)
+    print(f"Trained {report['episodes']} episodes, {report['steps']} steps "
+          f"({report['steps_per_second']:.0f} steps/s), episode lengths: {report['episode_lengths']}")
     
     # Print Q-table after learning
     agent.print_q_table()
@@ -0,0 +1,249 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from agent_learning import Agent
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+STATE_SPACE_SIZES = (100, 10_000, 1_000_000)
+
+
+def populated_agent(num_states, exploration_rate=0.1, seed=0):
+    """Builds an agent whose Q-table already holds num_states grid states with random values."""
+    agent = Agent(id=f"bench_{num_states}", exploration_rate=exploration_rate)
+    side = int(np.ceil(np.sqrt(num_states)))
+    states = [(i // side, i % side) for i in range(num_states)]
+    agent.q_table.state_id_batch(states)
+    rng = np.random.default_rng(seed)
+    agent.q_table.table[:] = rng.standard_normal((num_states, len(agent.actions)))
+    agent.q_table.refresh()
+    return agent, states
+
+
+def bench_choose_action(num_states, iterations=200_000):
+    agent, states = populated_agent(num_states)
+    picks = [states[i] for i in np.random.default_rng(1).integers(0, num_states, iterations).tolist()]
+
+    def run():
+        choose_action = agent.choose_action
+        for state in picks:
+            choose_action(state)
+        return iterations
+    return run
+
+
+def bench_update_q_table(num_states, iterations=200_000):
+    agent, states = populated_agent(num_states)
+    rng = np.random.default_rng(2)
+    transitions = [
+        (states[s], agent.actions[a], r, states[n])
+        for s, a, r, n in zip(rng.integers(0, num_states, iterations).tolist(),
+                              rng.integers(0, len(agent.actions), iterations).tolist(),
+                              rng.integers(-1, 2, iterations).tolist(),
+                              rng.integers(0, num_states, iterations).tolist())
+    ]
+
+    def run():
+        update_q_table = agent.update_q_table
+        for state, action, reward, next_state in transitions:
+            update_q_table(state, action, reward, next_state)
+        return iterations
+    return run
+
+
+def bench_single_episodes(episodes):
+    # One learn_from_experience call per episode at full exploration
+    agent = Agent(id="bench_episode", exploration_decay=1.0)
+
+    def run():
+        return sum(agent.learn_from_experience(episodes=1)['steps'] for _ in range(episodes))
+    return run
+
+
+def bench_episodes(episodes, exploration_decay):
+    agent = Agent(id="bench_episodes", exploration_decay=exploration_decay)
+
+    def run():
+        return agent.learn_from_experience(episodes=episodes)['steps']
+    return run
+
+
+def bench_batch(episodes, num_envs):
+    agent = Agent(id="bench_batch")
+
+    def run():
+        return agent.learn_from_batch(episodes=episodes, num_envs=num_envs, seed=0)['steps']
+    return run
+
+
+def benchmark_cases(quick=False):
+    """Returns (name, unit, factory) for every benchmark; factories build a fresh callable per measurement."""
+    sizes = STATE_SPACE_SIZES[:2] if quick else STATE_SPACE_SIZES
+    iterations = 20_000 if quick else 200_000
+    cases = []
+    # The iteration count is part of the name, so quick runs never compare against full ones
+    for size in sizes:
+        cases.append((f"choose_action[states={size},calls={iterations}]", 'calls',
+                      lambda size=size: bench_choose_action(size, iterations)))
+        cases.append((f"update_q_table[states={size},calls={iterations}]", 'calls',
+                      lambda size=size: bench_update_q_table(size, iterations)))
+    # A single full episode at full exploration, and multi-episode runs with decay
+    episodes = 100 if quick else 1000
+    cases.append((f"single_episode[episodes={episodes // 10},exploration=1.0]", 'steps',
+                  lambda: bench_single_episodes(episodes // 10)))
+    cases.append((f"learn_from_experience[episodes={episodes}]", 'steps',
+                  lambda: bench_episodes(episodes, 0.995)))
+    cases.append((f"learn_from_batch[episodes={5 * episodes},envs=256]", 'steps',
+                  lambda: bench_batch(5 * episodes, 256)))
+    return cases
+
+
+def measure(factory, repeats=5):
+    """
+    Times a benchmark and separately measures its memory behaviour.
+
+    The reported rate is the median of the timed repeats, and 'spread' is their
+    range relative to that median, so compare() can tell a slowdown from noise.
+    Timing runs are untraced, since tracemalloc slows allocation-heavy code down
+    considerably; one extra traced run reports how many blocks the run left alive
+    (a net count, not the number of allocations made) and its peak traced memory.
+    """
+    rates = []
+    ops = 0
+    for _ in range(repeats):
+        run = factory()
+        random.seed(0)
+        start = time.perf_counter()
+        ops = run()
+        seconds = time.perf_counter() - start
+        rates.append(ops / seconds if seconds > 0 else 0.0)
+    median_rate = statistics.median(rates)
+    spread = (max(rates) - min(rates)) / median_rate if median_rate else 0.0
+
+    run = factory()
+    random.seed(0)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    net_live_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+    return {
+        'ops': ops,
+        'repeats': repeats,
+        'ops_per_second': median_rate,
+        'best_ops_per_second': max(rates),
+        'spread': spread,
+        'net_live_blocks': net_live_blocks,
+        'peak_bytes': peak,
+    }
+
+
+def run_benchmarks(quick=False, repeats=5, selected=None):
+    """Runs the suite and returns the JSON-serializable results."""
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'benchmarks': {},
+    }
+    for name, unit, factory in benchmark_cases(quick):
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        result = measure(factory, repeats)
+        result['unit'] = unit
+        results['benchmarks'][name] = result
+        print(f"{name:<55} {result['ops_per_second']:>14,.0f} {unit}/s  (spread {result['spread']:.0%})",
+              file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compares median rates with a stored baseline.
+
+    A benchmark only counts as slower when its median drops by more than both the
+    tolerance and the noise seen in the repeats, taken as the sum of the baseline's
+    and the current run's relative spread.
+
+    :return: List of (name, baseline rate, current rate, ratio, threshold) for every
+             benchmark that got slower by more than its threshold.
+    """
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        reference = baseline.get('benchmarks', {}).get(name)
+        if not reference or not reference['ops_per_second']:
+            continue
+        ratio = result['ops_per_second'] / reference['ops_per_second']
+        threshold = max(tolerance, result.get('spread', 0.0) + reference.get('spread', 0.0))
+        if ratio < 1.0 - threshold:
+            regressions.append((name, reference['ops_per_second'], result['ops_per_second'], ratio, threshold))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Q-learning hot path.",
+        epilog="Results are compared against benchmark_baseline.json next to this script, recorded on "
+               "the machine and environment listed in its 'environment' section. Rates are only "
+               "comparable on the same machine: before using the check elsewhere, run once with "
+               "--save-baseline on the reference commit, then run without it on the change.")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes for a fast smoke run.")
+    parser.add_argument('--repeats', type=int, default=5, help="Timed repetitions per benchmark; the median is compared.")
+    parser.add_argument('--only', nargs='*', help="Run only benchmarks whose name contains one of these strings.")
+    parser.add_argument('--output', help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Minimum slowdown before failing (0.1 = 10%%); widened to the measured noise.")
+    args = parser.parse_args()
+
+    # Keep per-episode logging out of the measurements
+    logging.disable(logging.INFO)
+    results = run_benchmarks(quick=args.quick, repeats=args.repeats, selected=args.only)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            baseline_file.write(output)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.", file=sys.stderr)
+    else:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('environment') != results['environment']:
+            print(f"Baseline was recorded in a different environment: {baseline.get('environment')}", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, reference, current, ratio, threshold in regressions:
+            print(f"REGRESSION {name}: {current:,.0f}/s vs baseline {reference:,.0f}/s "
+                  f"({ratio:.0%}, allowed {1.0 - threshold:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
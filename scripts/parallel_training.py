@@ -0,0 +1,202 @@
+import logging
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+
+from agent_learning import Agent
+from q_table import QTable
+
+logger = logging.getLogger(__name__)
+
+# The Echo Network personas, trained side by side by default
+PERSONAS = ["arete", "joeria", "kajus", "lovis", "reiner"]
+
+
+def merge_q_tables(tables):
+    """
+    Averages Q-tables over the union of their states. A state's merged row is the
+    mean of the rows of the tables that have visited it, so states only one agent
+    has seen keep that agent's values.
+
+    :param tables: List of QTable objects sharing the same actions.
+    :return: A new QTable with states in first-seen order.
+    """
+    actions = tables[0].actions
+    merged_ids = {}
+    merged_states = []
+    row_maps = []
+    for table in tables:
+        if table.actions != actions:
+            raise ValueError("Only Q-tables with identical actions can be merged.")
+        row_map = np.empty(len(table), dtype=np.int64)
+        for state_id, state in enumerate(table.states):
+            merged_id = merged_ids.get(state)
+            if merged_id is None:
+                merged_id = merged_ids[state] = len(merged_states)
+                merged_states.append(state)
+            row_map[state_id] = merged_id
+        row_maps.append(row_map)
+
+    sums = np.zeros((len(merged_states), len(actions)), dtype=np.float64)
+    counts = np.zeros(len(merged_states), dtype=np.int64)
+    for table, row_map in zip(tables, row_maps):
+        sums[row_map] += table.table
+        counts[row_map] += 1
+    return QTable.from_arrays(actions, merged_states, sums / np.maximum(counts, 1)[:, None])
+
+
+def blend_q_table(own, merged, weight):
+    """Moves an agent's table towards the merged table by the given weight."""
+    if weight >= 1.0:
+        return QTable.from_arrays(merged.actions, merged.states, merged.table)
+    blended = QTable.from_arrays(merged.actions, merged.states, merged.table)
+    own_rows = blended.state_id_batch(own.states)
+    blended.values[own_rows] = (1.0 - weight) * own.table + weight * merged.table[own_rows]
+    blended.refresh(own_rows)
+    return blended
+
+
+def _train_round(task):
+    """Worker entry point: trains one agent for one round from a snapshot of its state."""
+    agent_id, agent_kwargs, states, values, exploration_rate, episodes, seed = task
+    agent = Agent(agent_id, **agent_kwargs)
+    agent.q_table = QTable.from_arrays(agent.actions, states, values)
+    agent.exploration_rate = exploration_rate
+
+    # Seeded per (run seed, agent, round) so results do not depend on scheduling
+    random.seed(seed)
+    start = time.perf_counter()
+    report = agent.learn_from_experience(episodes=episodes)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'agent_id': agent_id,
+        'states': agent.q_table.states,
+        'values': agent.q_table.table.copy(),
+        'exploration_rate': agent.exploration_rate,
+        'episodes': episodes,
+        'steps': report['steps'],
+        'seconds': elapsed,
+        'worker_pid': os.getpid(),
+    }
+
+
+class ParallelTrainer:
+    """
+    Trains several Q-learning agents in a process pool and periodically shares
+    what they learned.
+
+    Training runs in rounds. In each round every agent runs learn_from_experience
+    in a worker process, starting from a snapshot of its Q-table and exploration
+    rate. After the round, the tables are averaged with merge_q_tables and each
+    agent moves towards the merged table by merge_weight, which is the social
+    learning step. Every (agent, round) task is seeded from the run seed, so the
+    outcome is the same whatever the number of workers.
+    """
+
+    def __init__(self, agent_ids=None, num_workers=None, seed=0, merge_weight=1.0, agent_kwargs=None):
+        """
+        Initializes the trainer.
+
+        :param agent_ids: IDs of the agents to train (default: the five personas).
+        :param num_workers: Number of worker processes (default: os.cpu_count()).
+        :param seed: Seed from which every training task is seeded.
+        :param merge_weight: How far each agent moves towards the merged table after
+                             a round: 0 disables sharing, 1 adopts the merged table.
+        :param agent_kwargs: Extra keyword arguments for every Agent (e.g. learning_rate).
+        """
+        self.agent_ids = list(agent_ids or PERSONAS)
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.seed = seed
+        self.merge_weight = merge_weight
+        self.agent_kwargs = dict(agent_kwargs or {})
+        self.rounds_completed = 0
+
+        # Snapshot of each agent between rounds: (QTable, exploration rate)
+        template = Agent(self.agent_ids[0], **self.agent_kwargs)
+        self.actions = template.actions
+        self.agents = {
+            agent_id: (QTable(self.actions), template.exploration_rate) for agent_id in self.agent_ids
+        }
+        self.worker_stats = {}
+
+    def _tasks(self, episodes):
+        tasks = []
+        for agent_id in self.agent_ids:
+            table, exploration_rate = self.agents[agent_id]
+            tasks.append((agent_id, self.agent_kwargs, table.states, table.table.copy(),
+                          exploration_rate, episodes, f"{self.seed}:{agent_id}:{self.rounds_completed}"))
+        return tasks
+
+    def _record(self, result):
+        stats = self.worker_stats.setdefault(result['worker_pid'], {'episodes': 0, 'steps': 0, 'seconds': 0.0})
+        stats['episodes'] += result['episodes']
+        stats['steps'] += result['steps']
+        stats['seconds'] += result['seconds']
+
+    def train(self, rounds=10, episodes_per_round=100):
+        """
+        Runs a number of training rounds.
+
+        :return: A summary with per-agent and per-worker throughput statistics.
+        """
+        agent_stats = {agent_id: {'episodes': 0, 'steps': 0, 'seconds': 0.0} for agent_id in self.agent_ids}
+        context = multiprocessing.get_context('spawn')
+        start = time.perf_counter()
+
+        with context.Pool(processes=min(self.num_workers, len(self.agent_ids))) as pool:
+            for _ in range(rounds):
+                results = pool.map(_train_round, self._tasks(episodes_per_round))
+
+                tables = []
+                for result in results:
+                    table = QTable.from_arrays(self.actions, result['states'], result['values'])
+                    self.agents[result['agent_id']] = (table, result['exploration_rate'])
+                    tables.append(table)
+                    self._record(result)
+                    stats = agent_stats[result['agent_id']]
+                    for key in ('episodes', 'steps', 'seconds'):
+                        stats[key] += result[key]
+
+                if self.merge_weight > 0 and len(tables) > 1:
+                    merged = merge_q_tables(tables)
+                    for agent_id, (table, exploration_rate) in self.agents.items():
+                        self.agents[agent_id] = (blend_q_table(table, merged, self.merge_weight), exploration_rate)
+
+                self.rounds_completed += 1
+                logger.info(f"Training round {self.rounds_completed} complete for {len(results)} agents")
+
+        elapsed = time.perf_counter() - start
+        for stats in list(agent_stats.values()) + list(self.worker_stats.values()):
+            stats['steps_per_second'] = stats['steps'] / stats['seconds'] if stats['seconds'] else 0.0
+
+        total_steps = sum(stats['steps'] for stats in agent_stats.values())
+        return {
+            'rounds': rounds,
+            'seconds': elapsed,
+            'total_steps': total_steps,
+            'steps_per_second': total_steps / elapsed if elapsed else 0.0,
+            'agents': agent_stats,
+            'workers': self.worker_stats,
+        }
+
+    def get_agent(self, agent_id):
+        """Returns an Agent holding the current Q-table and exploration rate of agent_id."""
+        table, exploration_rate = self.agents[agent_id]
+        agent = Agent(agent_id, **self.agent_kwargs)
+        agent.q_table = QTable.from_arrays(self.actions, table.states, table.table)
+        agent.exploration_rate = exploration_rate
+        return agent
+
+
+# Example usage: train the five personas in parallel with shared Q-tables
+if __name__ == "__main__":
+    trainer = ParallelTrainer(seed=42)
+    summary = trainer.train(rounds=5, episodes_per_round=200)
+    print(f"Trained {len(trainer.agent_ids)} agents: {summary['total_steps']} steps "
+          f"in {summary['seconds']:.2f}s ({summary['steps_per_second']:.0f} steps/s)")
+    for pid, stats in summary['workers'].items():
+        print(f"  worker {pid}: {stats['episodes']} episodes, {stats['steps_per_second']:.0f} steps/s")
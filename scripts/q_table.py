@@ -0,0 +1,190 @@
+import numpy as np
+
+
+class QTable:
+    """
+    Array-backed Q-table. Each state seen by the agent is mapped to a dense row ID
+    in a growable 2-D float array and each action to a column index, so lookups
+    are a single dict access followed by array indexing, and whole batches of
+    states can be reduced with vectorized argmax/max.
+
+    The argmax column and max value of every row are cached in best_ids and
+    best_values. Writes through update() keep the cache current in O(1); only
+    lowering the value of a row's current best action rescans that row. Code that
+    writes to `values` directly must call refresh() for the rows it touched.
+
+    The table still behaves like the old dict of dicts where it is read from
+    outside the agent: `state in table`, `len(table)`, `table[state]` and
+    `table.items()` return per-state {action: value} dicts.
+    """
+
+    def __init__(self, actions, initial_capacity=1024, dtype=np.float64):
+        """
+        Initializes an empty table.
+
+        :param actions: Ordered list of actions; their order defines the columns.
+        :param initial_capacity: Number of state rows allocated up front.
+        :param dtype: Floating point type of the stored Q-values.
+        """
+        self.actions = list(actions)
+        self.action_index = {action: index for index, action in enumerate(self.actions)}
+        self.values = np.zeros((max(1, initial_capacity), len(self.actions)), dtype=dtype)
+        # Zero rows: the best action is the first one, with value 0
+        self.best_ids = np.zeros(len(self.values), dtype=np.int64)
+        self.best_values = np.zeros(len(self.values), dtype=dtype)
+        self.state_ids = {}
+        self.states = []
+
+    @classmethod
+    def from_arrays(cls, actions, states, values):
+        """Builds a table from a list of states and a matching (len(states), len(actions)) array."""
+        table = cls(actions, initial_capacity=len(states))
+        table.values[:len(states)] = values
+        table.states = list(states)
+        table.state_ids = {state: state_id for state_id, state in enumerate(table.states)}
+        table.refresh()
+        return table
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, state):
+        return state in self.state_ids
+
+    def __getitem__(self, state):
+        row = self.values[self.state_ids[state]].tolist()
+        return dict(zip(self.actions, row))
+
+    def __iter__(self):
+        return iter(self.states)
+
+    def items(self):
+        """Yields (state, {action: value}) pairs in insertion order."""
+        rows = self.table.tolist()
+        for state, row in zip(self.states, rows):
+            yield state, dict(zip(self.actions, row))
+
+    @property
+    def table(self):
+        """View of the rows that are in use, one per known state."""
+        return self.values[:len(self.states)]
+
+    def state_id(self, state):
+        """Returns the row ID of a state, adding a zero-initialised row if it is new."""
+        state_id = self.state_ids.get(state)
+        if state_id is None:
+            state_id = self._add_state(state)
+        return state_id
+
+    def state_id_batch(self, states):
+        """Returns an int64 array of row IDs for a sequence of states."""
+        state_ids = list(map(self.state_ids.get, states))
+        if None in state_ids:
+            # Only new states fall back to the slower insertion path
+            state_ids = [self.state_id(state) if state_id is None else state_id
+                         for state, state_id in zip(states, state_ids)]
+        return np.array(state_ids, dtype=np.int64)
+
+    def _add_state(self, state):
+        state_id = len(self.states)
+        if state_id == len(self.values):
+            grown = np.zeros((2 * len(self.values), len(self.actions)), dtype=self.values.dtype)
+            grown[:state_id] = self.values
+            self.values = grown
+            self.best_ids = np.concatenate((self.best_ids, np.zeros(state_id, dtype=np.int64)))
+            self.best_values = np.concatenate((self.best_values, np.zeros(state_id, dtype=grown.dtype)))
+        self.state_ids[state] = state_id
+        self.states.append(state)
+        return state_id
+
+    def get(self, state, action):
+        """Returns Q(state, action), or 0.0 for a state that has not been seen."""
+        state_id = self.state_ids.get(state)
+        if state_id is None:
+            return 0.0
+        return self.values.item(state_id, self.action_index[action])
+
+    def set(self, state, action, value):
+        """Sets Q(state, action)."""
+        self.update(self.state_id(state), self.action_index[action], value)
+
+    def update(self, state_id, action_id, value):
+        """
+        Sets the value at (row ID, column index) and updates the cached best action
+        of the row. Raising a value, or lowering one that is not the row's best,
+        is O(1); lowering the best value rescans the row.
+        """
+        self.values[state_id, action_id] = value
+        best_id = self.best_ids.item(state_id)
+        best_value = self.best_values.item(state_id)
+        if value > best_value or (value == best_value and action_id < best_id):
+            self.best_ids[state_id] = action_id
+            self.best_values[state_id] = value
+        elif action_id == best_id and value < best_value:
+            row = self.values[state_id]
+            best_id = row.argmax()
+            self.best_ids[state_id] = best_id
+            self.best_values[state_id] = row[best_id]
+
+    def q_learning_update(self, state_id, action_id, reward, next_state_id, learning_rate, discount_factor):
+        """
+        Applies one Q-learning update to (row ID, column index), bootstrapping
+        from the cached best value of the next row.
+
+        :return: The change in the Q-value.
+        """
+        current_q = self.values.item(state_id, action_id)
+        q_delta = learning_rate * (reward + discount_factor * self.best_values.item(next_state_id) - current_q)
+        self.update(state_id, action_id, current_q + q_delta)
+        return q_delta
+
+    def q_learning_update_batch(self, state_ids, action_ids, rewards, next_state_ids,
+                                learning_rate, discount_factor, weights=None):
+        """
+        Vectorized Q-learning update over arrays of row IDs and column indices.
+        Every transition is computed from the same pre-update table, and updates to
+        a repeated state-action pair are accumulated instead of overwritten.
+        Optional weights scale each update (e.g. importance-sampling weights).
+
+        :return: The TD errors of the transitions.
+        """
+        current_q = self.values[state_ids, action_ids]
+        td_errors = rewards + discount_factor * self.best_values[next_state_ids] - current_q
+        deltas = learning_rate * td_errors
+        if weights is not None:
+            deltas *= weights
+        np.add.at(self.values, (state_ids, action_ids), deltas)
+        self.refresh(state_ids)
+        return td_errors
+
+    def refresh(self, state_ids=None):
+        """
+        Recomputes the cached best actions from the values, for the given row IDs
+        or for every row in use. Needed after writing to `values` directly.
+        """
+        if state_ids is None:
+            state_ids = np.arange(len(self.states))
+        rows = self.values[state_ids]
+        best_ids = rows.argmax(axis=1)
+        self.best_ids[state_ids] = best_ids
+        self.best_values[state_ids] = rows[np.arange(len(best_ids)), best_ids]
+
+    def best_action(self, state):
+        """Returns the action with the highest Q-value; ties go to the earliest action."""
+        return self.actions[self.best_ids.item(self.state_id(state))]
+
+    def max_value(self, state):
+        """Returns the highest Q-value of a state."""
+        return self.best_values.item(self.state_id(state))
+
+    def best_actions(self, state_ids):
+        """Vectorized argmax: column index of the best action for each row ID."""
+        return self.best_ids[state_ids]
+
+    def max_values(self, state_ids):
+        """Vectorized max: highest Q-value for each row ID."""
+        return self.best_values[state_ids]
+
+    def to_dict(self):
+        """Converts the table back into the dict-of-dicts representation."""
+        return dict(self.items())
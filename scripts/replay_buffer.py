@@ -0,0 +1,188 @@
+import numpy as np
+
+
+class SumTree:
+    """
+    Binary tree over a fixed number of leaves where every node holds the sum of
+    its children. Leaves hold sampling priorities, so updating a priority and
+    finding the leaf for a given prefix sum are both O(log n).
+
+    The tree is stored in one flat array: node i has children 2i and 2i + 1 and
+    the leaves start at the first power of two >= capacity.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.leaf_offset = 1 << max(0, (capacity - 1).bit_length())
+        self.depth = self.leaf_offset.bit_length() - 1
+        self.nodes = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    @property
+    def total(self):
+        """Sum of all priorities."""
+        return self.nodes.item(1)
+
+    def get(self, indices):
+        """Returns the priorities stored at the given leaf indices."""
+        return self.nodes[np.asarray(indices) + self.leaf_offset]
+
+    def update(self, index, priority):
+        """Sets the priority of a single leaf and refreshes its ancestors."""
+        nodes = self.nodes
+        node = index + self.leaf_offset
+        change = priority - nodes.item(node)
+        while node:
+            nodes[node] += change
+            node >>= 1
+
+    def update_batch(self, indices, priorities):
+        """Sets many leaf priorities at once, rebuilding ancestors level by level."""
+        nodes = self.nodes
+        node_ids = np.asarray(indices, dtype=np.int64) + self.leaf_offset
+        nodes[node_ids] = priorities
+        for _ in range(self.depth):
+            node_ids = np.unique(node_ids >> 1)
+            nodes[node_ids] = nodes[2 * node_ids] + nodes[2 * node_ids + 1]
+
+    def find(self, prefix_sums, size=None):
+        """
+        Vectorized descent: for each prefix sum returns the leaf index whose
+        cumulative priority range contains it.
+
+        :param size: Number of leading leaves in use (default: capacity). Leaves
+                     past it have zero priority and are never returned.
+        """
+        nodes = self.nodes
+        values = np.array(prefix_sums, dtype=np.float64)
+        node_ids = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * node_ids
+            left_sums = nodes[left]
+            go_right = values >= left_sums
+            values -= np.where(go_right, left_sums, 0.0)
+            node_ids = left + go_right
+        leaves = node_ids - self.leaf_offset
+        # Guard against rounding pushing a draw onto an empty trailing leaf
+        return np.minimum(leaves, (self.capacity if size is None else size) - 1)
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity experience replay for (state, action, reward, next_state, done)
+    transitions, stored in preallocated NumPy ring arrays.
+
+    Sampling is uniform by default. With prioritized=True, transitions are drawn
+    proportionally to priority^alpha through a SumTree, new transitions get the
+    current maximum priority, and samples carry importance-sampling weights.
+    Insertion and sampling are O(log n) and no Python objects are kept per
+    transition.
+    """
+
+    def __init__(self, capacity, state_shape=(), state_dtype=np.int64, prioritized=False,
+                 alpha=0.6, beta=0.4, epsilon=1e-6, seed=None):
+        """
+        Initializes the buffer.
+
+        :param capacity: Maximum number of transitions kept; the oldest are overwritten.
+        :param state_shape: Shape of one state (default: a scalar, e.g. a Q-table row ID).
+        :param state_dtype: Dtype of the stored states.
+        :param prioritized: Use prioritized instead of uniform sampling.
+        :param alpha: How strongly priorities shape the sampling distribution.
+        :param beta: Importance-sampling correction exponent.
+        :param epsilon: Added to TD errors so no transition has zero priority.
+        :param seed: Seed for sampling.
+        """
+        if capacity < 1:
+            raise ValueError("Replay buffer capacity must be positive.")
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.zeros((capacity,) + tuple(state_shape), dtype=state_dtype)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros((capacity,) + tuple(state_shape), dtype=state_dtype)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+
+        self.position = 0
+        self.size = 0
+        self.tree = SumTree(capacity) if prioritized else None
+        self.max_priority = 1.0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Stores a single transition, overwriting the oldest one when full."""
+        index = self.position
+        self.states[index] = state
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.next_states[index] = next_state
+        self.dones[index] = done
+        if self.tree is not None:
+            self.tree.update(index, self.max_priority)
+
+        self.position = (index + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Stores a batch of transitions with vectorized writes."""
+        count = len(actions)
+        if count > self.capacity:
+            # Only the newest transitions can survive
+            skip = count - self.capacity
+            states, actions, rewards = states[skip:], actions[skip:], rewards[skip:]
+            next_states, dones = next_states[skip:], dones[skip:]
+            self.position = (self.position + skip) % self.capacity
+            count = self.capacity
+
+        indices = (self.position + np.arange(count)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        if self.tree is not None:
+            self.tree.update_batch(indices, np.full(count, self.max_priority))
+
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Draws a batch of transitions.
+
+        :return: (states, actions, rewards, next_states, dones, indices, weights).
+                 Weights are all ones for uniform sampling.
+        """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer.")
+
+        if self.tree is None:
+            indices = self.rng.integers(0, self.size, size=batch_size)
+            weights = np.ones(batch_size, dtype=np.float64)
+        else:
+            # Stratified draws: one uniform point in each of batch_size equal segments
+            total = self.tree.total
+            segment = total / batch_size
+            points = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+            indices = self.tree.find(points, self.size)
+            probabilities = self.tree.get(indices) / total
+            weights = (self.size * probabilities) ** -self.beta
+            weights /= weights.max()
+
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices], indices, weights)
+
+    def update_priorities(self, indices, td_errors):
+        """Sets the priorities of sampled transitions from their new TD errors."""
+        if self.tree is None:
+            return
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        self.tree.update_batch(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class VectorGridEnvironment:
+    """
+    Steps a batch of independent grid-world episodes at once with NumPy.
+
+    The dynamics match Agent.simulate_environment: moving right is rewarded,
+    moving left is penalized, moving up or down is neutral, and an episode ends
+    once either coordinate reaches the grid size. Finished episodes are reset to
+    a new random start automatically, so the batch always holds num_envs live
+    episodes. With max_steps set, episodes that have not ended after that many
+    steps are cut off (truncated) and reset as well.
+    """
+
+    ACTIONS = ["move_left", "move_right", "move_up", "move_down"]
+    # (dx, dy) per action, in ACTIONS order
+    MOVES = np.array([(-1, 0), (1, 0), (0, 1), (0, -1)], dtype=np.int64)
+    REWARDS = np.array([-1, 1, 0, 0], dtype=np.float64)
+
+    def __init__(self, num_envs, grid_size=10, seed=None, max_steps=None):
+        """
+        Initializes the batch.
+
+        :param num_envs: Number of episodes stepped in parallel.
+        :param grid_size: Coordinate at which an episode ends (default: 10).
+        :param seed: Seed for the start positions.
+        :param max_steps: Optional step limit after which an episode is truncated.
+        """
+        self.num_envs = num_envs
+        self.grid_size = grid_size
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros((num_envs, 2), dtype=np.int64)
+        self.episode_returns = np.zeros(num_envs, dtype=np.float64)
+        self.episode_lengths = np.zeros(num_envs, dtype=np.int64)
+
+    def _random_states(self, count):
+        # Start positions are drawn like Agent.get_state: both coordinates in [0, grid_size]
+        return self.rng.integers(0, self.grid_size + 1, size=(count, 2))
+
+    def reset(self):
+        """Starts a fresh episode in every slot and returns the start states."""
+        self.states = self._random_states(self.num_envs)
+        self.episode_returns.fill(0)
+        self.episode_lengths.fill(0)
+        return self.states.copy()
+
+    def step(self, action_ids):
+        """
+        Applies one action per episode.
+
+        :param action_ids: Integer array of action indices into ACTIONS, one per episode.
+        :return: (next_states, rewards, dones, info). next_states are the states the
+                 actions led to, before finished episodes are reset; dones covers both
+                 terminal and truncated episodes. info holds the 'episode_returns' and
+                 'episode_lengths' of the episodes that ended and the 'truncated' mask.
+        """
+        next_states = self.states + self.MOVES[action_ids]
+        rewards = self.REWARDS[action_ids]
+        dones = (next_states >= self.grid_size).any(axis=1)
+
+        self.episode_returns += rewards
+        self.episode_lengths += 1
+        if self.max_steps is not None:
+            truncated = ~dones & (self.episode_lengths >= self.max_steps)
+            dones |= truncated
+        else:
+            truncated = np.zeros(self.num_envs, dtype=np.bool_)
+        info = {
+            'episode_returns': self.episode_returns[dones],
+            'episode_lengths': self.episode_lengths[dones],
+            'truncated': truncated,
+        }
+
+        self.states = next_states.copy()
+        finished = np.flatnonzero(dones)
+        if finished.size:
+            self.states[finished] = self._random_states(finished.size)
+            self.episode_returns[finished] = 0
+            self.episode_lengths[finished] = 0
+        return next_states, rewards, dones, info
+
+    @staticmethod
+    def state_tuples(states):
+        """Converts an (N, 2) state array into the tuple states used as Q-table keys."""
+        return list(map(tuple, states.tolist()))
@@ -0,0 +1,255 @@
+import logging
+import zlib
+from itertools import product
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Mood scores used when projecting an agent onto its feature vector
+MOOD_SCORES = {
+    'sad': -1.0,
+    'negative': -0.5,
+    'neutral': 0.0,
+    'positive': 0.5,
+    'happy': 1.0,
+}
+
+# Goals the BaseAgent behaviours can set, in a fixed feature order
+KNOWN_GOALS = ('achieve_more', 'explore_uncharted', 'maintain_stability')
+
+# Number of hashed buckets used to summarise an agent's knowledge
+KNOWLEDGE_BUCKETS = 4
+
+FEATURE_DIMENSIONS = 1 + len(KNOWN_GOALS) + KNOWLEDGE_BUCKETS
+
+
+def agent_features(agent):
+    """
+    Projects a BaseAgent onto a fixed-length feature vector: its mood score,
+    the share of each known goal among its goals, and a hashed bag of its
+    knowledge items so that agents who know the same things end up close.
+    """
+    features = np.zeros(FEATURE_DIMENSIONS, dtype=np.float64)
+    features[0] = MOOD_SCORES.get(agent.mood, 0.0)
+
+    if agent.goals:
+        for goal in agent.goals:
+            if goal in KNOWN_GOALS:
+                features[1 + KNOWN_GOALS.index(goal)] += 1.0
+        features[1:1 + len(KNOWN_GOALS)] /= len(agent.goals)
+
+    knowledge = agent.state.get('knowledge', [])
+    if knowledge:
+        offset = 1 + len(KNOWN_GOALS)
+        for item in knowledge:
+            bucket = zlib.crc32(str(item).encode()) % KNOWLEDGE_BUCKETS
+            features[offset + bucket] += 1.0
+        features[offset:] /= len(knowledge)
+
+    return features
+
+
+class SocialNeighborIndex:
+    """
+    Spatial index over agent feature vectors that answers "which agents have an
+    affinity above the interaction threshold with agent i" without scanning the
+    whole population.
+
+    Affinity between two agents is 1 / (1 + d), where d is the Euclidean distance
+    between their feature vectors, so the threshold maps to a search radius of
+    1 / threshold - 1. Two backends are available:
+
+    - 'grid' hashes agents into cells of one radius width over the first few
+      feature dimensions and checks the neighbouring cells. Results are exact.
+    - 'lsh' uses p-stable locality sensitive hashing with several tables. It
+      scales to many dimensions but may occasionally miss a partner.
+
+    Both backends are updated in place when an agent's features change.
+    """
+
+    def __init__(self, dimensions=FEATURE_DIMENSIONS, threshold=None, backend='grid',
+                 grid_dims=4, num_tables=6, num_projections=3, seed=None):
+        """
+        Initializes the index.
+
+        :param dimensions: Length of the feature vectors.
+        :param threshold: Minimum affinity for two agents to be partners
+                          (default: Config.AGENT_INTERACTION_THRESHOLD).
+        :param backend: 'grid' or 'lsh' (default: 'grid').
+        :param grid_dims: Number of leading dimensions hashed by the grid backend.
+        :param num_tables: Number of hash tables used by the LSH backend.
+        :param num_projections: Projections concatenated per LSH table.
+        :param seed: Seed for the LSH projections.
+        """
+        if backend not in ('grid', 'lsh'):
+            raise ValueError(f"Unknown neighbor index backend: {backend}")
+
+        self.dimensions = dimensions
+        self.threshold = Config.AGENT_INTERACTION_THRESHOLD if threshold is None else threshold
+        if not 0.0 < self.threshold <= 1.0:
+            raise ValueError("Threshold must be in (0, 1].")
+        self.radius = 1.0 / self.threshold - 1.0
+        self.backend = backend
+
+        # Feature storage: one row per slot, reused after removals
+        self.features = np.zeros((16, dimensions), dtype=np.float64)
+        self.slot_ids = [None] * 16
+        self.slots = {}
+        self.free_slots = []
+        self.next_slot = 0
+
+        # Hash tables map bucket keys to the set of slots they contain
+        cell = max(self.radius, 1e-9)
+        if backend == 'grid':
+            self.grid_dims = min(grid_dims, dimensions)
+            self.cell_size = cell
+            self.offsets = list(product((-1, 0, 1), repeat=self.grid_dims))
+            self.tables = [{}]
+        else:
+            rng = np.random.default_rng(seed)
+            self.bucket_width = 4.0 * cell
+            self.projections = rng.standard_normal((num_tables, num_projections, dimensions))
+            self.shifts = rng.uniform(0, self.bucket_width, size=(num_tables, num_projections))
+            self.tables = [{} for _ in range(num_tables)]
+        self.slot_keys = {}
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, agent_id):
+        return agent_id in self.slots
+
+    def _keys(self, vector):
+        """Returns one bucket key per hash table for a feature vector."""
+        if self.backend == 'grid':
+            cell = np.floor(vector[:self.grid_dims] / self.cell_size).astype(np.int64)
+            return [tuple(cell.tolist())]
+        hashed = np.floor((self.projections @ vector + self.shifts) / self.bucket_width)
+        return [tuple(row) for row in hashed.astype(np.int64).tolist()]
+
+    def _allocate_slot(self):
+        if self.free_slots:
+            return self.free_slots.pop()
+        if self.next_slot == len(self.features):
+            grown = np.zeros((2 * len(self.features), self.dimensions), dtype=np.float64)
+            grown[:len(self.features)] = self.features
+            self.features = grown
+            self.slot_ids.extend([None] * (len(grown) - len(self.slot_ids)))
+        slot = self.next_slot
+        self.next_slot += 1
+        return slot
+
+    def _unlink(self, slot):
+        for table, key in zip(self.tables, self.slot_keys.pop(slot)):
+            bucket = table[key]
+            bucket.discard(slot)
+            if not bucket:
+                del table[key]
+
+    def update(self, agent_id, features):
+        """Inserts an agent or moves it to the buckets matching its new features."""
+        vector = np.asarray(features, dtype=np.float64)
+        if vector.shape != (self.dimensions,):
+            raise ValueError(f"Expected a feature vector of length {self.dimensions}.")
+
+        keys = self._keys(vector)
+        slot = self.slots.get(agent_id)
+        if slot is None:
+            slot = self._allocate_slot()
+            self.slots[agent_id] = slot
+            self.slot_ids[slot] = agent_id
+        elif self.slot_keys[slot] == keys:
+            # Same buckets: only the stored vector changes
+            self.features[slot] = vector
+            return
+        else:
+            self._unlink(slot)
+
+        self.features[slot] = vector
+        self.slot_keys[slot] = keys
+        for table, key in zip(self.tables, keys):
+            table.setdefault(key, set()).add(slot)
+
+    def update_agent(self, agent):
+        """Re-indexes a BaseAgent after its mood, goals or knowledge changed."""
+        self.update(agent.name, agent_features(agent))
+
+    def remove(self, agent_id):
+        """Removes an agent from the index."""
+        slot = self.slots.pop(agent_id, None)
+        if slot is None:
+            return
+        self._unlink(slot)
+        self.slot_ids[slot] = None
+        self.free_slots.append(slot)
+
+    def affinity(self, agent_a, agent_b):
+        """Returns the affinity between two indexed agents."""
+        a = self.features[self.slots[agent_a]]
+        b = self.features[self.slots[agent_b]]
+        return 1.0 / (1.0 + float(np.linalg.norm(a - b)))
+
+    def _candidates(self, slot):
+        candidates = set()
+        if self.backend == 'grid':
+            table = self.tables[0]
+            base = self.slot_keys[slot][0]
+            for offset in self.offsets:
+                bucket = table.get(tuple(c + o for c, o in zip(base, offset)))
+                if bucket:
+                    candidates.update(bucket)
+        else:
+            for table, key in zip(self.tables, self.slot_keys[slot]):
+                candidates.update(table[key])
+        candidates.discard(slot)
+        return candidates
+
+    def partners(self, agent_id, limit=None):
+        """
+        Returns the agents whose affinity with agent_id is at or above the
+        threshold, as (agent_id, affinity) tuples sorted by affinity.
+
+        :param agent_id: The agent to find partners for.
+        :param limit: Optional maximum number of partners to return.
+        """
+        slot = self.slots[agent_id]
+        candidates = self._candidates(slot)
+        if not candidates:
+            return []
+
+        candidate_slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        distances = np.linalg.norm(self.features[candidate_slots] - self.features[slot], axis=1)
+        affinities = 1.0 / (1.0 + distances)
+        matches = np.nonzero(affinities >= self.threshold)[0]
+        order = matches[np.argsort(-affinities[matches], kind='stable')]
+        if limit is not None:
+            order = order[:limit]
+        return [(self.slot_ids[candidate_slots[i]], float(affinities[i])) for i in order]
+
+
+# Example usage:
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    population = 50_000
+    # Agents cluster around a few hundred social "types"
+    centers = rng.random((500, FEATURE_DIMENSIONS))
+    vectors = centers[rng.integers(0, len(centers), population)]
+    vectors = vectors + rng.normal(0, 0.05, vectors.shape)
+
+    for backend in ('grid', 'lsh'):
+        index = SocialNeighborIndex(backend=backend, seed=0)
+        start = time.perf_counter()
+        for agent_id in range(population):
+            index.update(agent_id, vectors[agent_id])
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = sum(len(index.partners(agent_id)) for agent_id in range(1000))
+        query = time.perf_counter() - start
+        print(f"[{backend}] build {build:.2f}s, 1000 queries {query * 1000:.1f} ms, "
+              f"{found / 1000:.1f} partners per agent")
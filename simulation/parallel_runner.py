@@ -0,0 +1,328 @@
+import contextlib
+import logging
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from agents.arete import BaseAgent
+from config import Config
+from simulation.interaction_sampler import InteractionSampler
+
+logger = logging.getLogger(__name__)
+
+# Moods an agent can publish to other shards, indexed by their shared-memory code
+MOODS = ('neutral', 'positive', 'negative', 'happy', 'sad')
+MOOD_CODES = {mood: code for code, mood in enumerate(MOODS)}
+
+# Per-agent fields published at every step barrier
+STATE_FIELDS = ('mood', 'goals', 'knowledge', 'memory')
+
+
+def agent_name(index):
+    """Returns the name of the agent at a given population index."""
+    return f"agent_{index}"
+
+
+def process_event(agent, event):
+    """
+    Runs an event through the agent's handlers. Mirrors BaseAgent.process_event,
+    but only calls decide_next_action when the agent actually defines it.
+    """
+    if hasattr(agent, 'decide_next_action'):
+        agent.process_event(event)
+        return
+    agent.update_mood(event)
+    agent.analyze_event(event)
+    agent.record_memory(event)
+
+
+class SimulationShard:
+    """
+    A contiguous slice of the agent population, stepped by one process.
+
+    Agents only see each other through the published state arrays: during step t
+    every shard reads the snapshot of step t and writes the snapshot of step t + 1,
+    so no shard ever observes a partially updated neighbour. All randomness is
+    derived from (seed, step, agent index), which keeps the outcome independent of
+    how the population is partitioned.
+    """
+
+    def __init__(self, start, stop, num_agents, seed=0, interaction_rate=None,
+                 event_rate=0.2, agent_factory=BaseAgent, quiet=True):
+        """
+        Initializes the shard.
+
+        :param start: Index of the first agent in the shard.
+        :param stop: Index one past the last agent in the shard.
+        :param num_agents: Size of the whole population.
+        :param seed: Seed shared by every shard of the same run.
+        :param interaction_rate: Passed to the InteractionSampler.
+        :param event_rate: Probability of each agent receiving a non-social event per step.
+        :param agent_factory: Callable building an agent from its name.
+        :param quiet: Silences the agents' print output while stepping.
+        """
+        self.start = start
+        self.stop = stop
+        self.seed = seed
+        self.event_rate = event_rate
+        self.devnull = open(os.devnull, 'w') if quiet else None
+        # Every shard draws the same global pairs from an identically seeded sampler
+        self.sampler = InteractionSampler(num_agents, rate=interaction_rate, seed=seed)
+        with self._output():
+            self.agents = [agent_factory(agent_name(index)) for index in range(start, stop)]
+
+    def _output(self):
+        if self.devnull is not None:
+            return contextlib.redirect_stdout(self.devnull)
+        return contextlib.nullcontext()
+
+    def close(self):
+        """Closes the handle used to silence agent output."""
+        if self.devnull is not None:
+            self.devnull.close()
+            self.devnull = None
+
+    def write_snapshot(self, state):
+        """Publishes the state of this shard's agents into a shared state array."""
+        for offset, agent in enumerate(self.agents):
+            state[self.start + offset] = (
+                MOOD_CODES.get(agent.mood, 0),
+                len(agent.goals),
+                len(agent.state['knowledge']),
+                len(agent.memory),
+            )
+
+    def _partners(self, pairs):
+        """Groups the sampled pairs by the local agent they involve."""
+        partners = {}
+        for column in (0, 1):
+            local = (pairs[:, column] >= self.start) & (pairs[:, column] < self.stop)
+            for index, partner in pairs[local][:, (column, 1 - column)].tolist():
+                partners.setdefault(index, []).append(partner)
+        return partners
+
+    def _events(self, rng, index, partners, current):
+        """Builds the events an agent receives this step from the global snapshot."""
+        events = []
+        for partner in sorted(partners):
+            events.append({
+                'type': 'social_interaction',
+                'sender': agent_name(partner),
+                'message': f"Hello {agent_name(index)}!",
+                'emotion': MOODS[current[partner, 0]],
+            })
+
+        if rng.random() < self.event_rate:
+            kind = rng.choice(('environment_change', 'learning', 'decision'))
+            if kind == 'environment_change':
+                events.append({
+                    'type': kind,
+                    'environment_quality': rng.choice(('good', 'poor', 'average')),
+                })
+            elif kind == 'learning':
+                events.append({
+                    'type': kind,
+                    'learning_data': f"lesson_{rng.randint(0, 99)}",
+                    'learning_type': rng.choice(('reinforcement', 'imitation')),
+                    'reward': rng.randint(0, 20),
+                    'imitator': agent_name(rng.choice(partners)) if partners else 'environment',
+                })
+            else:
+                events.append({
+                    'type': kind,
+                    'decision_type': rng.choice(('risk', 'safe')),
+                })
+        return events
+
+    def step(self, step, current, upcoming):
+        """
+        Advances every agent of the shard by one step.
+
+        :param step: The step number, used to derive per-agent random streams.
+        :param current: Shared state array holding the snapshot of this step.
+        :param upcoming: Shared state array receiving the snapshot of the next step.
+        """
+        partners = self._partners(self.sampler.sample_pairs())
+        # BaseAgent draws from the global random module, so it is seeded per agent
+        # below; the caller's global random state is restored afterwards
+        global_state = random.getstate()
+        try:
+            with self._output():
+                for offset, agent in enumerate(self.agents):
+                    index = self.start + offset
+                    rng = random.Random(f"{self.seed}:{step}:{index}")
+                    random.seed(rng.random())
+                    for event in self._events(rng, index, partners.get(index, []), current):
+                        process_event(agent, event)
+        finally:
+            random.setstate(global_state)
+        self.write_snapshot(upcoming)
+
+
+def _shard_worker(connection, memory_name, shape, shard_args):
+    """Worker process loop: steps one shard each time the coordinator asks."""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    buffers = np.ndarray(shape, dtype=np.int32, buffer=memory.buf)
+    shard = None
+    try:
+        shard = SimulationShard(*shard_args)
+        shard.write_snapshot(buffers[0])
+        connection.send('ready')
+        while True:
+            step = connection.recv()
+            if step is None:
+                break
+            shard.step(step, buffers[step % 2], buffers[(step + 1) % 2])
+            connection.send(step)
+    except Exception as e:
+        logger.error(f"Simulation worker for agents {shard_args[0]}-{shard_args[1]} failed: {e}")
+        connection.send(e)
+    finally:
+        if shard is not None:
+            shard.close()
+        del buffers
+        memory.close()
+        connection.close()
+
+
+class ParallelSimulation:
+    """
+    Steps a population of BaseAgent instances across a pool of worker processes.
+
+    The population is split into contiguous shards, one per worker. Agent state
+    that other shards need (mood, goal, knowledge and memory counts) lives in a
+    double-buffered multiprocessing.shared_memory array; the coordinator acts as
+    the step barrier by waiting for every worker before starting the next step.
+    With num_workers=1 the single shard is stepped in-process, and the results of
+    any worker count are identical for the same seed.
+    """
+
+    def __init__(self, num_agents, num_workers=None, seed=0, interaction_rate=None,
+                 event_rate=0.2, agent_factory=BaseAgent, quiet=True):
+        """
+        Initializes the simulation and starts the worker processes.
+
+        :param num_agents: Size of the agent population.
+        :param num_workers: Number of worker processes (default: Config.SIMULATION_WORKERS).
+        :param seed: Seed for interactions and agent events.
+        :param interaction_rate: Passed to the InteractionSampler.
+        :param event_rate: Probability of each agent receiving a non-social event per step.
+        :param agent_factory: Picklable callable building an agent from its name.
+        :param quiet: Silences the agents' print output while stepping.
+        """
+        self.num_agents = num_agents
+        self.num_workers = max(1, min(num_workers or Config.SIMULATION_WORKERS, num_agents))
+        self.steps_completed = 0
+        shape = (2, num_agents, len(STATE_FIELDS))
+
+        self.memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        self.buffers = np.ndarray(shape, dtype=np.int32, buffer=self.memory.buf)
+        self.buffers.fill(0)
+
+        bounds = np.linspace(0, num_agents, self.num_workers + 1).astype(int)
+        shard_args = [
+            (int(start), int(stop), num_agents, seed, interaction_rate, event_rate, agent_factory, quiet)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+
+        self.shard = None
+        self.workers = []
+        if self.num_workers == 1:
+            self.shard = SimulationShard(*shard_args[0])
+            self.shard.write_snapshot(self.buffers[0])
+            return
+
+        context = multiprocessing.get_context('spawn')
+        try:
+            for args in shard_args:
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_shard_worker, args=(child, self.memory.name, shape, args), daemon=True)
+                process.start()
+                child.close()
+                self.workers.append((process, parent))
+            self._wait('ready')
+        except Exception:
+            self.close()
+            raise
+        logger.info(f"Started {self.num_workers} simulation workers for {num_agents} agents")
+
+    def _wait(self, expected):
+        for process, connection in self.workers:
+            reply = connection.recv()
+            if isinstance(reply, Exception):
+                raise RuntimeError(f"Simulation worker {process.pid} failed: {reply}")
+            if reply != expected:
+                raise RuntimeError(f"Unexpected reply from simulation worker {process.pid}: {reply}")
+
+    def step(self):
+        """Advances the whole population by one step."""
+        step = self.steps_completed
+        if self.shard is not None:
+            self.shard.step(step, self.buffers[step % 2], self.buffers[(step + 1) % 2])
+        else:
+            for _, connection in self.workers:
+                connection.send(step)
+            self._wait(step)
+        self.steps_completed += 1
+
+    def run(self, steps):
+        """
+        Runs a number of steps.
+
+        :return: A copy of the final per-agent state array, one row per agent and
+                 one column per entry of STATE_FIELDS.
+        """
+        for _ in range(steps):
+            self.step()
+        return self.state()
+
+    def state(self):
+        """Returns a copy of the most recently published agent state."""
+        return self.buffers[self.steps_completed % 2].copy()
+
+    def close(self):
+        """Stops the workers and releases the shared memory."""
+        for process, connection in self.workers:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self.workers = []
+        if self.shard is not None:
+            self.shard.close()
+
+        if self.memory is not None:
+            del self.buffers
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Example usage: compare a single-process run with a parallel one
+if __name__ == "__main__":
+    import time
+
+    population, steps = 5000, 20
+    results = {}
+    for workers in (1, max(2, Config.SIMULATION_WORKERS)):
+        start = time.perf_counter()
+        with ParallelSimulation(population, num_workers=workers, seed=42) as simulation:
+            results[workers] = simulation.run(steps)
+        print(f"{workers} worker(s): {time.perf_counter() - start:.2f}s for {steps} steps")
+
+    identical = all(np.array_equal(results[1], result) for result in results.values())
+    print(f"Results identical across worker counts: {identical}")
@@ -0,0 +1,80 @@
+import argparse
+import json
+import random
+import sys
+import time
+
+from utilities import SERIALIZERS, serialize, deserialize
+
+MOODS = ["happy", "curious", "neutral", "frustrated", "anxious"]
+
+
+def agent_state_payload(seed=0, knowledge_items=200, q_states=400):
+    """Builds an agent-state dict shaped like what AgentData and TrainingData persist."""
+    rng = random.Random(seed)
+    return {
+        'agent_id': f"agent_{seed}",
+        'status': 'learning',
+        'last_updated': '2024-01-01 12:00:00',
+        'mood': rng.choice(MOODS),
+        'goals': [f"goal_{i}" for i in range(5)],
+        'performance': {
+            'episodes': rng.randint(0, 10000),
+            'average_reward': rng.random(),
+            'reward_history': [round(rng.gauss(0, 1), 6) for _ in range(100)],
+        },
+        'knowledge': [
+            {'source': rng.choice(MOODS), 'fact': f"observation {i}", 'confidence': rng.random()}
+            for i in range(knowledge_items)
+        ],
+        'q_table': {
+            f"{x},{y}": {action: rng.gauss(0, 1) for action in ("move_left", "move_right", "move_up", "move_down")}
+            for x, y in ((i // 20, i % 20) for i in range(q_states))
+        },
+    }
+
+
+def training_step_payload(seed=0):
+    """A single training step record."""
+    rng = random.Random(seed)
+    return {'episode': seed, 'state': [rng.randint(0, 10), rng.randint(0, 10)],
+            'action': 'move_right', 'reward': rng.choice([-1, 0, 1]), 'exploration_rate': rng.random()}
+
+
+def benchmark(payload, serializer, min_seconds=0.2):
+    """Returns (bytes, dumps per second, loads per second) for one payload and serializer."""
+    raw = serialize(payload, serializer)
+    if deserialize(raw) != json.loads(json.dumps(payload)):
+        raise AssertionError(f"{serializer} does not round-trip the payload")
+
+    rates = []
+    for operation in (lambda: serialize(payload, serializer), lambda: deserialize(raw)):
+        calls = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            operation()
+            calls += 1
+        rates.append(calls / (time.perf_counter() - start))
+    return len(raw), rates[0], rates[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare save_json/load_json serializers on agent payloads.")
+    parser.add_argument('--min-seconds', type=float, default=0.2, help="Minimum time per measurement.")
+    args = parser.parse_args()
+
+    payloads = {
+        'agent_state': agent_state_payload(),
+        'training_step': training_step_payload(),
+    }
+    for name, payload in payloads.items():
+        print(f"{name}:")
+        print(f"  {'serializer':<10} {'bytes':>10} {'dumps/s':>12} {'loads/s':>12}")
+        for serializer in SERIALIZERS:
+            size, dumps_rate, loads_rate = benchmark(payload, serializer, args.min_seconds)
+            print(f"  {serializer:<10} {size:>10,} {dumps_rate:>12,.0f} {loads_rate:>12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
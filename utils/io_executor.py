@@ -0,0 +1,159 @@
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import Config
+from utilities import save_json, load_json
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_io_executor():
+    """Returns the process-wide I/O executor, sized by Config.IO_WORKERS and Config.IO_MAX_PENDING."""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None or _shared_executor.closed:
+            _shared_executor = IOExecutor(Config.IO_WORKERS, Config.IO_MAX_PENDING)
+            atexit.register(_shared_executor.shutdown)
+        return _shared_executor
+
+
+class IOExecutor:
+    """
+    Thread pool that runs file I/O off the calling thread.
+
+    submit() returns a concurrent.futures.Future right away; run() is the
+    asyncio equivalent. Tasks submitted with the same key (normally a file path)
+    run one at a time in submission order, so writes to one file never overtake
+    each other, while tasks for different keys run in parallel. At most
+    max_pending tasks can be waiting or running; further submissions block (or
+    raise queue.Full when block=False), which keeps memory bounded when disk
+    cannot keep up.
+    """
+
+    def __init__(self, num_workers=4, max_pending=1024, name='echo-io'):
+        """
+        Initializes the executor.
+
+        :param num_workers: Number of I/O threads.
+        :param max_pending: Maximum number of queued and running tasks.
+        :param name: Prefix of the worker thread names.
+        """
+        self.pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix=name)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        # key -> tasks waiting behind the task currently running for that key
+        self.queues = {}
+        self.outstanding = 0
+        self.closed = False
+
+    def submit(self, fn, *args, key=None, block=True, timeout=None, kwargs=None):
+        """
+        Schedules fn(*args, **kwargs).
+
+        :param key: Tasks with the same key run sequentially, in submission order.
+        :param block: Wait for a free slot when max_pending tasks are outstanding;
+                      with block=False a full executor raises queue.Full.
+        :param timeout: Maximum seconds to wait for a slot.
+        :param kwargs: Keyword arguments for fn, as a dict, so they can never be
+                       mistaken for the executor's own key/block/timeout.
+        :return: A Future with the task's result.
+        """
+        self._check_open()
+        if not self.slots.acquire(block, timeout):
+            raise queue.Full("Too many pending I/O tasks.")
+        return self._schedule(key, fn, args, kwargs)
+
+    async def run(self, fn, *args, key=None, kwargs=None):
+        """
+        Awaitable version of submit(): schedules the task and waits for its
+        result without blocking the event loop. While the executor is full, a
+        helper thread waits for a free slot and wakes the coroutine once it has one.
+        """
+        self._check_open()
+        if not self.slots.acquire(False):
+            waiter = asyncio.get_running_loop().run_in_executor(None, self.slots.acquire)
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # The helper thread still takes the slot; hand it back once it has
+                waiter.add_done_callback(lambda _: self.slots.release())
+                raise
+        return await asyncio.wrap_future(self._schedule(key, fn, args, kwargs))
+
+    def _check_open(self):
+        if self.closed:
+            raise RuntimeError("The I/O executor has been shut down.")
+
+    def _schedule(self, key, fn, args, kwargs):
+        """Queues a task for which a slot has already been taken."""
+        future = Future()
+        task = (future, fn, args, kwargs or {})
+        with self.lock:
+            self.outstanding += 1
+            if key is not None:
+                pending = self.queues.get(key)
+                if pending is not None:
+                    # The worker running this key's current task picks it up next
+                    pending.append(task)
+                    return future
+                self.queues[key] = deque()
+        self.pool.submit(self._run, key, task)
+        return future
+
+    def _run(self, key, task):
+        while True:
+            future, fn, args, kwargs = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            self.slots.release()
+
+            with self.lock:
+                self.outstanding -= 1
+                if self.outstanding == 0:
+                    self.idle.notify_all()
+                if key is None:
+                    return
+                pending = self.queues[key]
+                if not pending:
+                    del self.queues[key]
+                    return
+                task = pending.popleft()
+
+    def drain(self, timeout=None):
+        """
+        Waits until every submitted task has finished.
+
+        :return: True if the executor became idle within the timeout.
+        """
+        with self.lock:
+            return self.idle.wait_for(lambda: self.outstanding == 0, timeout)
+
+    def shutdown(self, wait=True):
+        """Stops accepting tasks; with wait, finishes the outstanding ones first."""
+        if self.closed:
+            return
+        self.closed = True
+        if wait:
+            self.drain()
+        self.pool.shutdown(wait=wait)
+
+
+def save_json_async(data, filename):
+    """Queues save_json on the shared I/O executor; returns a Future."""
+    return get_io_executor().submit(save_json, data, filename, key=os.path.abspath(filename))
+
+
+def load_json_async(filename):
+    """Queues load_json on the shared I/O executor, after any pending writes to the file; returns a Future."""
+    return get_io_executor().submit(load_json, filename, key=os.path.abspath(filename))
@@ -1,8 +1,30 @@
 import json
 import logging
 import os
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; file locks are no-ops there
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 # Setup a logger
 def setup_logger(name, log_file, level=logging.INFO):
     """Sets up a logger that outputs to both the console and a log file."""
@@ -24,21 +46,121 @@ def generate_agent_id():
     """Generates a unique ID based on the current time."""
     return f"agent_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
 
+# Serializers used by save_json/load_json: name -> (dumps to bytes, loads from bytes, magic prefix)
+SERIALIZERS = {}
+DEFAULT_FORMAT = 'json'
+
+def register_serializer(name, dumps, loads, magic=None):
+    """
+    Registers a serialization format. Binary formats must have a magic prefix,
+    which load_json uses to recognise them; formats without one are read as JSON.
+    """
+    SERIALIZERS[name] = (dumps, loads, magic)
+
+def set_default_format(name):
+    """Sets the format save_json uses when none is given."""
+    global DEFAULT_FORMAT
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serialization format '{name}'; available: {sorted(SERIALIZERS)}")
+    DEFAULT_FORMAT = name
+
+def _compact_json_dumps(data):
+    # orjson/ujson when installed; the stdlib covers what they reject (e.g. big ints)
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    elif ujson is not None:
+        try:
+            return ujson.dumps(data, ensure_ascii=False).encode()
+        except (TypeError, OverflowError):
+            pass
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode()
+
+def _json_loads(raw):
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # e.g. NaN or Infinity written by the stdlib encoder
+            pass
+    return json.loads(raw)
+
+BINARY_MAGIC = b'EJZ1'
+
+register_serializer('json', _compact_json_dumps, _json_loads)
+register_serializer('pretty', lambda data: json.dumps(data, indent=4).encode(), _json_loads)
+register_serializer('binary',
+                    lambda data: BINARY_MAGIC + zlib.compress(_compact_json_dumps(data), 1),
+                    lambda raw: _json_loads(zlib.decompress(raw[len(BINARY_MAGIC):])),
+                    magic=BINARY_MAGIC)
+if msgpack is not None:
+    MSGPACK_MAGIC = b'EMP1'
+    register_serializer('msgpack',
+                        lambda data: MSGPACK_MAGIC + msgpack.packb(data, use_bin_type=True),
+                        lambda raw: msgpack.unpackb(raw[len(MSGPACK_MAGIC):], raw=False, strict_map_key=False),
+                        magic=MSGPACK_MAGIC)
+
+def serialize(data, serializer=None):
+    """Encodes data with a registered serializer (default: DEFAULT_FORMAT) and returns bytes."""
+    return SERIALIZERS[serializer or DEFAULT_FORMAT][0](data)
+
+def deserialize(raw):
+    """Decodes bytes written by serialize, detecting the format from its magic prefix."""
+    for dumps, loads, magic in SERIALIZERS.values():
+        if magic is not None and raw.startswith(magic):
+            return loads(raw)
+    return _json_loads(raw)
+
 # Function for saving JSON data to a file
-def save_json(data, filename):
-    """Saves data to a JSON file."""
-    with open(filename, 'w') as json_file:
-        json.dump(data, json_file, indent=4)
+def save_json(data, filename, serializer=None):
+    """
+    Saves data to a file. The default 'json' format is compact JSON (through
+    orjson or ujson when installed; note that orjson writes NaN as null);
+    'pretty' is indented JSON and 'binary' zlib-compressed JSON.
+    """
+    with open(filename, 'wb') as json_file:
+        json_file.write(serialize(data, serializer))
+
+# Function for saving JSON data atomically
+def write_json_atomic(data, filename, serializer=None):
+    """Saves data like save_json, to a temporary file next to filename that is synced and renamed into place."""
+    temp_path = f"{filename}.tmp"
+    with open(temp_path, 'wb') as json_file:
+        json_file.write(serialize(data, serializer))
+        json_file.flush()
+        os.fsync(json_file.fileno())
+    os.replace(temp_path, filename)
 
 # Function for loading JSON data from a file
 def load_json(filename):
-    """Loads data from a JSON file."""
+    """Loads data saved by save_json in any format, detected automatically."""
     if os.path.exists(filename):
-        with open(filename, 'r') as json_file:
-            return json.load(json_file)
+        with open(filename, 'rb') as json_file:
+            return deserialize(json_file.read())
     else:
         return {}
 
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive advisory lock for a file while the block runs. The lock is
+    taken on a separate path + '.lock' file, so it stays valid when the file
+    itself is replaced.
+    """
+    with open(f"{path}.lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+# Function for appending an entry to a log file
+def append_log_entry(path, text):
+    """Appends text to a log file under its file_lock, so trimming the log cannot lose it."""
+    with file_lock(path):
+        with open(path, 'a') as log_file:
+            log_file.write(text)
+
 # Function to ensure a directory exists
 def ensure_directory_exists(directory):
     """Creates the directory if it doesn't exist."""